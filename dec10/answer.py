@@ -6,7 +6,9 @@ import logging
 import operator
 import pathlib
 import re
-from typing import Union, Tuple, NamedTuple, Iterator, List
+from typing import Union, Tuple, NamedTuple, Iterator, List, Dict
+
+import numpy as np
 
 from dec10 import INPUT
 from util.helpers import load_values_list
@@ -15,6 +17,56 @@ logger = logging.getLogger(__name__)
 
 PATTERN = re.compile(r'-?\d+')
 
+# The 6x10 font the sky writes in. Blank columns are trimmed before lookup,
+# so the keys are independent of the inter-glyph spacing.
+FONT = {
+    'A': ('..##..', '.#..#.', '#....#', '#....#', '#....#',
+          '######', '#....#', '#....#', '#....#', '#....#'),
+    'B': ('#####.', '#....#', '#....#', '#....#', '#####.',
+          '#....#', '#....#', '#....#', '#....#', '#####.'),
+    'C': ('.####.', '#....#', '#.....', '#.....', '#.....',
+          '#.....', '#.....', '#.....', '#....#', '.####.'),
+    'E': ('######', '#.....', '#.....', '#.....', '#####.',
+          '#.....', '#.....', '#.....', '#.....', '######'),
+    'F': ('######', '#.....', '#.....', '#.....', '#####.',
+          '#.....', '#.....', '#.....', '#.....', '#.....'),
+    'G': ('.####.', '#....#', '#.....', '#.....', '#.....',
+          '#..###', '#....#', '#....#', '#...##', '.###.#'),
+    'H': ('#....#', '#....#', '#....#', '#....#', '######',
+          '#....#', '#....#', '#....#', '#....#', '#....#'),
+    'J': ('...###', '....#.', '....#.', '....#.', '....#.',
+          '....#.', '....#.', '#...#.', '#...#.', '.###..'),
+    'K': ('#....#', '#...#.', '#..#..', '#.#...', '##....',
+          '##....', '#.#...', '#..#..', '#...#.', '#....#'),
+    'L': ('#.....', '#.....', '#.....', '#.....', '#.....',
+          '#.....', '#.....', '#.....', '#.....', '######'),
+    'N': ('#....#', '##...#', '##...#', '#.#..#', '#.#..#',
+          '#..#.#', '#..#.#', '#...##', '#...##', '#....#'),
+    'P': ('#####.', '#....#', '#....#', '#....#', '#####.',
+          '#.....', '#.....', '#.....', '#.....', '#.....'),
+    'R': ('#####.', '#....#', '#....#', '#....#', '#####.',
+          '#..#..', '#...#.', '#...#.', '#....#', '#....#'),
+    'X': ('#....#', '#....#', '.#..#.', '.#..#.', '..##..',
+          '..##..', '.#..#.', '.#..#.', '#....#', '#....#'),
+    'Z': ('######', '.....#', '.....#', '....#.', '...#..',
+          '..#...', '.#....', '#.....', '#.....', '######'),
+}
+
+
+def glyph_key(bitmap: np.ndarray) -> Tuple[Tuple[int, int], bytes]:
+    """Build a lookup key for a glyph bitmap, ignoring blank border columns."""
+    columns = np.flatnonzero(bitmap.any(axis=0))
+    if columns.size:
+        bitmap = bitmap[:, columns[0]:columns[-1] + 1]
+    bitmap = np.ascontiguousarray(bitmap, dtype=np.bool_)
+    return bitmap.shape, bitmap.tobytes()
+
+
+GLYPHS: Dict[Tuple[Tuple[int, int], bytes], str] = {
+    glyph_key(np.array([[c == '#' for c in row] for row in rows], dtype=np.bool_)): letter
+    for letter, rows in FONT.items()
+}
+
 
 @dataclasses.dataclass
 class Point:
@@ -94,25 +146,46 @@ class StarChart:
         self.height = self.bottom - self.top
 
     def plot(self):
-        self.chart = [[None for _ in range(self.right + 1)] for __ in range(self.bottom + 1)]
-        for satellite in self.satellites:
-            self.chart[satellite.position.y][satellite.position.x] = '#'
+        """Plot the satellites into a bitmap offset by the bounding box."""
+        self.chart = np.zeros((self.height + 1, self.width + 1), dtype=np.bool_)
+        xs = np.fromiter((x.position.x for x in self.satellites), dtype=int, count=len(self.satellites))
+        ys = np.fromiter((x.position.y for x in self.satellites), dtype=int, count=len(self.satellites))
+        self.chart[ys - self.top, xs - self.left] = True
 
     def draw(self, delim='', na_rep=' ', header=False, index=False) -> str:
         """Draw the chart in as a human-readable table."""
         table = []
+        columns = range(self.left, self.right + 1)
         if header:
-            header = f"{delim}Row{delim}{f'{delim}'.join(str(x) for x in range(self.right))}"
-            sep = '-' * self.right
+            header = f"{delim}Row{delim}{f'{delim}'.join(str(x) for x in columns)}"
+            sep = '-' * len(header)
             table = [header, sep]
-        for ix, row in enumerate(self.chart):
-            row_text = f'{delim}'.join(na_rep if x is None else str(x) for x in row)
+        # Translate whole rows at once; each cell carries its trailing delimiter.
+        translation = {0: f'{na_rep}{delim}', 1: f'#{delim}'}
+        trim = len(delim)
+        for ix, row in enumerate(self.chart.view(np.uint8), start=self.top):
+            row_text = row.tobytes().decode('ascii').translate(translation)
+            if trim:
+                row_text = row_text[:-trim]
             if index:
                 row_text = f'{delim}{ix}{delim}{row_text}'
             table.append(row_text)
 
         return '\n'.join(table)
 
+    def segment(self) -> List[np.ndarray]:
+        """Split the plotted bitmap into glyphs on its blank columns."""
+        filled = self.chart.any(axis=0)
+        # Pad with blanks so every glyph has a rising and a falling edge.
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], filled, [False])).astype(np.int8)))
+        return [self.chart[:, start:stop] for start, stop in zip(edges[::2], edges[1::2])]
+
+    def read(self, unknown: str = '?') -> str:
+        """Read the plotted message using the built-in :data:`FONT`."""
+        if self.chart is None:
+            self.plot()
+        return ''.join(GLYPHS.get(glyph_key(glyph), unknown) for glyph in self.segment())
+
     def move(self, multiplier: int = 1, reverse: bool = False):
         for satellite in self.satellites:
             satellite.move(multiplier, reverse)
@@ -152,9 +225,11 @@ def get_satellites(path: pathlib.Path = INPUT) -> List[Satellite]:
     return satellites
 
 
-def get_answer1(path: pathlib.Path = INPUT):
+def get_answer1(path: pathlib.Path = INPUT, ocr: bool = False):
     satellites = get_satellites(path)
     chart = StarChart(satellites)
     chart.scan()
     print(chart.draw(na_rep=' '))
+    if ocr:
+        print(chart.read())
     return chart
@@ -1,11 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
-from collections import defaultdict
-from itertools import product
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from operator import attrgetter
-from typing import Tuple, Iterator, NamedTuple
+from typing import Iterator, NamedTuple, Sequence, ClassVar, Iterable, List, Tuple
+
+import numpy as np
 
 powergetter = attrgetter('power')
+sizegetter = attrgetter('size')
 
 
 class FuelCell(NamedTuple):
@@ -20,11 +24,22 @@ class PowerGrid(NamedTuple):
 
 
 class FuelGrid:
+    """A square grid of fuel cells backed by a NumPy summed-area table.
+
+    ``table[x, y]`` holds the total power of every cell in ``1..x`` by ``1..y``.
+    Row and column 0 are zero-padding so window sums need no bounds checks.
+
+    Tables are shared between grids through an LRU cache keyed by
+    ``(serial, size)``, so they are read-only.
+    """
+    CACHE_SIZE: ClassVar[int] = 128
+    BATCH_SIZE: ClassVar[int] = 64
+    _tables: ClassVar['OrderedDict[Tuple[int, int], np.ndarray]'] = OrderedDict()
 
     def __init__(self, serial: int, size: int = 300):
         self.serial: int = serial
         self.size: int = size
-        self.table: defaultdict = defaultdict(int)
+        self.table: np.ndarray = None
         self.populate()
 
     def range(self, reducer: int = 0) -> Iterator[int]:
@@ -33,28 +48,121 @@ class FuelGrid:
         return range(1, stop - reducer + 1)
 
     def populate(self):
-        table = self.table
-        serial = self.serial
-        for x, y in product(self.range(), self.range()):
-            rack_id = x + 10
-            power = (((rack_id * y + serial) * rack_id) // 100) % 10 - 5
-            table[(x, y)] = power + table[(x, y - 1)] + table[(x - 1, y)] - table[(x - 1, y - 1)]
+        self.table = self.summed_areas([self.serial], self.size)[0]
+
+    @staticmethod
+    def power_levels(serials: Sequence[int], size: int = 300) -> np.ndarray:
+        """The power of every cell for each serial, as a ``serials x size x size`` stack.
+
+        The arithmetic runs in ``int64`` since large serials overflow ``int32``;
+        only the final -5..4 levels are narrowed.
+        """
+        coords = np.arange(1, size + 1, dtype=np.int64)
+        rack_id = coords[np.newaxis, :, np.newaxis] + 10
+        serials = np.asarray(serials, dtype=np.int64)[:, np.newaxis, np.newaxis]
+        levels = (((rack_id * coords[np.newaxis, np.newaxis, :] + serials) * rack_id) // 100) % 10 - 5
+        return levels.astype(np.int8)
+
+    @classmethod
+    def summed_areas(cls, serials: Sequence[int], size: int = 300) -> List[np.ndarray]:
+        """Summed-area tables for each serial, served from the cache where possible.
+
+        Any tables not yet cached are built together in one vectorized pass.
+        """
+        tables = cls._tables
+        missing = [s for s in dict.fromkeys(serials) if (s, size) not in tables]
+        if missing:
+            stack = np.zeros((len(missing), size + 1, size + 1), dtype=np.int32)
+            stack[:, 1:, 1:] = cls.power_levels(missing, size).cumsum(axis=1).cumsum(axis=2)
+            for serial, table in zip(missing, stack):
+                table = table.copy()
+                table.setflags(write=False)
+                tables[serial, size] = table
+        result = []
+        for serial in serials:
+            tables.move_to_end((serial, size))
+            result.append(tables[serial, size])
+        while len(tables) > cls.CACHE_SIZE:
+            tables.popitem(last=False)
+        return result
+
+    @classmethod
+    def clear_cache(cls):
+        cls._tables.clear()
 
     def get_power(self, x: int, y: int, size: int = 3) -> int:
         table = self.table
         x0, y0, x1, y1 = x - 1, y - 1, x + size - 1, y + size - 1
-        return table[(x0, y0)] + table[(x1, y1)] - table[(x1, y0)] - table[(x0, y1)]
+        return int(table[x0, y0] + table[x1, y1] - table[x1, y0] - table[x0, y1])
 
-    def best_for_size(self, size: int) -> PowerGrid:
-        powers = (
-            PowerGrid(self.get_power(x, y, size), FuelCell(x, y), size)
-            for x, y in product(self.range(size), self.range(size))
-        )
-        return max(powers, key=powergetter)
+    def windows(self, size: int) -> np.ndarray:
+        """The power of every ``size`` square, indexed by its top-left cell - 1."""
+        table = self.table
+        return table[size:, size:] - table[:-size, size:] - table[size:, :-size] + table[:-size, :-size]
 
-    def best_overall(self) -> PowerGrid:
-        powers = (self.best_for_size(s) for s in self.range())
-        return max(powers, key=powergetter)
+    def best_for_size(self, size: int) -> PowerGrid:
+        powers = self.windows(size)
+        x, y = np.unravel_index(powers.argmax(), powers.shape)
+        return PowerGrid(int(powers[x, y]), FuelCell(int(x) + 1, int(y) + 1), size)
+
+    def best_for_sizes(self, sizes: Iterator[int]) -> PowerGrid:
+        return max((self.best_for_size(s) for s in sizes), key=powergetter)
+
+    def best_overall(self, workers: int = None) -> PowerGrid:
+        """Find the best square of any size.
+
+        Parameters
+        ----------
+        workers : int, optional
+            If given, split the sizes across this many worker processes.
+        """
+        sizes = range(1, self.size + 1)
+        if not workers or workers < 2:
+            return self.best_for_sizes(sizes)
+
+        # Interleave the sizes so each worker gets a similar share of the large windows.
+        batches = [sizes[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_best_for_sizes, repeat(self.serial), repeat(self.size), batches)
+            # Restore size order so ties resolve the same way as the serial search.
+            return max(sorted(results, key=sizegetter), key=powergetter)
+
+    @classmethod
+    def best_many(cls, serials: Sequence[int], sizes: Iterable[int] = None, grid_size: int = 300) \
+            -> List[PowerGrid]:
+        """Find the best square among ``sizes`` for each of many serials at once.
+
+        Serials are evaluated ``BATCH_SIZE`` at a time as a single 3-D stack,
+        so each window size costs one slice expression per batch.
+        """
+        sizes = sorted(set(sizes)) if sizes is not None else range(1, grid_size + 1)
+        best = []
+        for start in range(0, len(serials), cls.BATCH_SIZE):
+            batch = serials[start:start + cls.BATCH_SIZE]
+            tables = np.stack(cls.summed_areas(batch, grid_size))
+            rows = np.arange(len(batch))
+            powers = np.full(len(batch), np.iinfo(np.int32).min, dtype=np.int32)
+            xs, ys, ss = (np.zeros(len(batch), dtype=np.int32) for _ in range(3))
+            for s in sizes:
+                windows = (
+                    tables[:, s:, s:] - tables[:, :-s, s:] - tables[:, s:, :-s] + tables[:, :-s, :-s]
+                ).reshape(len(batch), -1)
+                index = windows.argmax(axis=1)
+                found = windows[rows, index]
+                # Strictly greater keeps the smallest size on ties, like the serial search.
+                better = found > powers
+                powers[better] = found[better]
+                xs[better], ys[better] = np.divmod(index[better], grid_size - s + 1)
+                ss[better] = s
+            best.extend(
+                PowerGrid(int(p), FuelCell(int(x) + 1, int(y) + 1), int(s))
+                for p, x, y, s in zip(powers, xs, ys, ss)
+            )
+        return best
+
+
+def _best_for_sizes(serial: int, grid_size: int, sizes: Sequence[int]) -> PowerGrid:
+    return FuelGrid(serial, grid_size).best_for_sizes(sizes)
 
 
 def get_answer1(serial: int, size: int = 3) -> PowerGrid:
@@ -62,6 +170,6 @@ def get_answer1(serial: int, size: int = 3) -> PowerGrid:
     return grid.best_for_size(size)
 
 
-def get_answer2(serial: int) -> PowerGrid:
+def get_answer2(serial: int, workers: int = None) -> PowerGrid:
     grid = FuelGrid(serial)
-    return grid.best_overall()
+    return grid.best_overall(workers)
@@ -1,32 +1,148 @@
 import dataclasses
+import hashlib
 import pathlib
-from typing import Set, Dict, Tuple
+from typing import Set, Dict, Tuple, NamedTuple, Optional
+
+import numpy as np
 
 from dec12 import INPUT
 
+PADDING = np.zeros(4, dtype=np.uint8)
+
+
+class Cycle(NamedTuple):
+    """The row's shape at ``start + period`` is the shape at ``start`` moved by ``shift`` pots."""
+    start: int
+    period: int
+    shift: int
+
 
 @dataclasses.dataclass
 class StateMachine:
+    """Simulate a row of pots as a dense ``uint8`` array.
+
+    ``pots[j]`` is the pot at ``offset + j``; the row is trimmed to its outermost
+    plants after every generation, so it never carries empty pots at the edges.
+    The rules are compiled into a 32-entry lookup table indexed by a 5-bit window,
+    where bit ``k`` is the pot at ``i - 2 + k``.
+
+    Every generation's trimmed row is fingerprinted by a digest of its bytes,
+    which doesn't depend on the offset. Once a fingerprint repeats, the pattern
+    is periodic (a glider when ``period == 1``) and any later generation is
+    computed in closed form from :attr:`cycle` instead of being simulated.
+    Only the first row, the newest row and the row at the start of the cycle
+    are kept; other generations are simulated again from one of those.
+    """
     state: Set[int]
     rules: Dict[str, str]
 
+    def __post_init__(self):
+        self.table: np.ndarray = self.compile_rules(self.rules)
+        self.pots: np.ndarray = np.zeros(0, dtype=np.uint8)
+        self.offset: int = 0
+        if self.state:
+            self.offset = min(self.state)
+            self.pots = np.zeros(max(self.state) - self.offset + 1, dtype=np.uint8)
+            self.pots[[x - self.offset for x in self.state]] = 1
+        self.generation: int = 0
+        # Fingerprint -> (generation, offset) of every generation simulated so far
+        self.seen: Dict[bytes, Tuple[int, int]] = {}
+        self.initial: Tuple[np.ndarray, int] = (self.pots, self.offset)
+        self.latest: Tuple[np.ndarray, int] = self.initial
+        self.anchor: Optional[Tuple[np.ndarray, int]] = None
+        self.cycle: Optional[Cycle] = None
+        self._record()
+
+    @staticmethod
+    def compile_rules(rules: Dict[str, str]) -> np.ndarray:
+        table = np.zeros(32, dtype=np.uint8)
+        for key, value in rules.items():
+            if value == '#':
+                table[sum(1 << k for k, x in enumerate(key) if x == '#')] = 1
+        if table[0]:
+            raise ValueError("Rule '.....' => '#' would fill an infinite row of pots.")
+        return table
+
+    @staticmethod
+    def fingerprint(pots: np.ndarray) -> bytes:
+        return hashlib.blake2b(pots.tobytes(), digest_size=16).digest()
+
+    def _advance(self):
+        pots = np.concatenate((PADDING, self.pots, PADDING))
+        windows = pots[:-4] | pots[1:-3] << 1 | pots[2:-2] << 2 | pots[3:-1] << 3 | pots[4:] << 4
+        result = self.table[windows]
+        # windows[m] is centered on the pot at offset - 2 + m
+        plants = np.flatnonzero(result)
+        if plants.size:
+            self.pots = result[plants[0]:plants[-1] + 1]
+            self.offset += int(plants[0]) - 2
+        else:
+            self.pots = result[:0]
+
+    def _record(self):
+        key = self.fingerprint(self.pots)
+        first = self.seen.get(key)
+        if first is None:
+            self.seen[key] = self.generation, self.offset
+            self.latest = self.pots, self.offset
+        else:
+            start, offset = first
+            self.cycle = Cycle(start, self.generation - start, self.offset - offset)
+            self.anchor = self.pots, offset
+
+    def _restore(self, row: Tuple[np.ndarray, int], generation: int, shift: int = 0):
+        self.pots, self.offset = row
+        self.offset += shift
+        self.generation = generation
+
+    def _simulate(self, generation: int, record: bool = False):
+        while self.generation < generation and not (record and self.cycle):
+            self._advance()
+            self.generation += 1
+            if record:
+                self._record()
+
+    def _sync(self):
+        self.state = set((np.flatnonzero(self.pots) + self.offset).tolist())
+
+    @property
+    def total(self) -> int:
+        plants = np.flatnonzero(self.pots)
+        return int(plants.sum()) + self.offset * plants.size
+
+    def seek(self, generation: int):
+        """Move the row to ``generation``, simulating only until a cycle is found."""
+        if generation < 0:
+            raise ValueError(f"Can't seek to generation {generation}.")
+        newest = len(self.seen) - 1
+        if self.cycle is None and generation >= newest:
+            # Resume simulating from the newest recorded generation.
+            self._restore(self.latest, newest)
+            self._simulate(generation, record=True)
+        if self.cycle is not None and generation >= self.cycle.start:
+            start, period, shift = self.cycle
+            laps, base = divmod(generation - start, period)
+            self._restore(self.anchor, start, laps * shift)
+            self._simulate(start + base)
+        elif self.generation != generation:
+            if self.generation > generation:
+                self._restore(self.initial, 0)
+            self._simulate(generation)
+
+    def total_at(self, generation: int) -> int:
+        self.seek(generation)
+        return self.total
+
     def step(self):
-        result = set()
-        for i in range(min(self.state) - 2, max(self.state) + 3):
-            key = ''.join(
-                '#' if j in self.state else '.' for j in range(i - 2, i + 3)
-            )
-            if self.rules[key] == '#':
-                result.add(i)
-        self.state = result
+        self.seek(self.generation + 1)
+        self._sync()
 
     def run(self, n: int = 1) -> Tuple[int, int, int]:
-        power = total = i = 0
-        for i in range(n):
-            power = total
-            self.step()
-            total = sum(self.state)
-        return power, total, i
+        start = self.generation
+        power = self.total_at(start + n - 1) if n > 1 else 0
+        total = self.total_at(start + n)
+        self._sync()
+        return power, total, n - 1
 
 
 def get_state_and_rules(path: pathlib.Path = INPUT) -> Tuple[Set[int], Dict[str, str]]:
@@ -46,5 +162,4 @@ def get_answer1(path: pathlib.Path = INPUT) -> int:
 def get_answer2(path: pathlib.Path = INPUT) -> int:
     state, rules = get_state_and_rules(path)
     machine = StateMachine(state, rules)
-    power, total, i = machine.run(1000)
-    return power + (total - power) * (50000000000 - i)
+    return machine.total_at(50000000000)
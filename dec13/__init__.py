@@ -6,3 +6,4 @@ from util import BASEDIR
 
 INPUT = BASEDIR / os.path.dirname(__file__) / 'input.txt'
 EXAMPLE = BASEDIR / os.path.dirname(__file__) / 'example.txt'
+EXAMPLE2 = BASEDIR / os.path.dirname(__file__) / 'example2.txt'
@@ -1,8 +1,13 @@
-from collections import defaultdict
+import struct
+import time
+import zlib
+from array import array
 from functools import total_ordering
-from typing import Mapping, NewType, Dict, Tuple, List
+from typing import Mapping, NewType, Dict, Tuple, List, Optional, Callable, NamedTuple
 
-from util.containers import Direction, Point
+import numpy as np
+
+from util.containers import Direction, Grid, Point
 
 Movement = NewType('Movement', Mapping[Direction, Direction])
 
@@ -33,6 +38,102 @@ ACTION_MAP = {
 }
 
 
+# Compiled track cells. Headings run clockwise so a cart's state is ``heading * 3 + turn``,
+# where ``turn`` is the number of intersections it has crossed, modulo 3.
+OFF_TRACK, STRAIGHT_TRACK, FORWARD_TRACK, REVERSE_TRACK, INTERSECTION_TRACK = range(5)
+HEADINGS = (UP, RIGHT, DOWN, LEFT)
+HEADING_INDEX = {x: i for i, x in enumerate(HEADINGS)}
+TURN_STATES = len(ACTION_MAP[INTERSECTION])
+CART_STATES = len(HEADINGS) * TURN_STATES
+DERAILED = 255
+CELL_MAP = {
+    INTERSECTION: INTERSECTION_TRACK,
+    FORWARD_DIAG: FORWARD_TRACK,
+    REVERSE_DIAG: REVERSE_TRACK,
+    HORIZONTAL: STRAIGHT_TRACK,
+    VERTICAL: STRAIGHT_TRACK,
+    # Carts start out on a straight piece of track.
+    **{x: STRAIGHT_TRACK for x in DIRECTION_MAP},
+}
+CELL_TYPES = np.zeros(256, dtype=np.uint8)
+CELL_TYPES[[ord(x) for x in CELL_MAP]] = list(CELL_MAP.values())
+
+
+def compile_transitions() -> np.ndarray:
+    """Build the ``(cell_type, heading, turn) -> state`` table from :data:`ACTION_MAP`."""
+    table = np.full((INTERSECTION_TRACK + 1, len(HEADINGS), TURN_STATES), DERAILED, dtype=np.uint8)
+    for icon, action in ACTION_MAP.items():
+        cell = CELL_MAP[icon]
+        for heading, direction in enumerate(HEADINGS):
+            for turn in range(TURN_STATES):
+                if isinstance(action, list):
+                    table[cell, heading, turn] = (
+                        HEADING_INDEX[action[turn][direction]] * TURN_STATES + (turn + 1) % TURN_STATES
+                    )
+                else:
+                    table[cell, heading, turn] = HEADING_INDEX[action[direction]] * TURN_STATES + turn
+    return table
+
+
+TRANSITIONS = compile_transitions()
+
+
+class Track:
+    """A track compiled into a dense ``uint8`` grid of cell types.
+
+    Cells are stored flat, so a position is ``(y + 1) * width + x`` (see :class:`Grid`).
+    Each row is padded with an off-track cell, and there's an off-track row above
+    and below the chart, so a cart leaving the chart in any direction derails
+    instead of wrapping around.
+    """
+    def __init__(self, chart: List[str]):
+        self.width: int = max(len(x) for x in chart) + 1
+        self.height: int = len(chart)
+        self.grid = Grid(self.width, self.height + 2, origin=(0, 1))
+        blank = ' ' * self.width
+        raw = ''.join([blank, *(x.ljust(self.width) for x in chart), blank]).encode('ascii')
+        self.cells: np.ndarray = CELL_TYPES[np.frombuffer(raw, dtype=np.uint8)]
+        self.carts: List[Tuple[int, int]] = [
+            (i, HEADING_INDEX[DIRECTION_MAP[chr(x)]] * TURN_STATES) for i, x in enumerate(raw)
+            if chr(x) in DIRECTION_MAP
+        ]
+
+    @classmethod
+    def from_cells(cls, cells: np.ndarray, width: int) -> 'Track':
+        """Rebuild a compiled track, e.g. from a snapshot. It has no starting carts."""
+        track = cls.__new__(cls)
+        track.width = width
+        track.height = len(cells) // width - 2
+        track.grid = Grid(width, track.height + 2, origin=(0, 1))
+        track.cells = cells
+        track.carts = []
+        return track
+
+    @property
+    def moves(self) -> Tuple[int, ...]:
+        """The change in position for each cart state."""
+        return tuple(self.grid.offset(HEADINGS[x // TURN_STATES]) for x in range(CART_STATES))
+
+    def encode(self, point: Point) -> int:
+        return self.grid.encode(*point)
+
+    def decode(self, position: int) -> Point:
+        return self.grid.decode(position)
+
+
+class DerailedError(ValueError):
+    pass
+
+
+class TickStats(NamedTuple):
+    """Instrumentation reported to :attr:`CartsController.on_tick` after every tick."""
+    tick: int
+    alive: int
+    collisions: int
+    elapsed: float
+    ticks_per_second: float
+
+
 @total_ordering
 class Cart:
     """An object which moves along a track."""
@@ -51,31 +152,49 @@ class Cart:
     def move(self, direction: Direction = None):
         self.position = self.position + (direction or self.direction)
 
-    def step(self, grid: Mapping):
-        self.move()
-        icon = grid[self.position]
-        action = STRAIGHT if icon in DIRECTION_MAP else ACTION_MAP[icon]
-        if isinstance(action, list):
-            # Choose an action based on the divisor of the previous number of intersections
-            # in relation to the number of available options
-            action = action[self.intersections % len(action)]
-            # Add to the index to randomize the next choice a bit
-            self.intersections += 1
-        self.direction = action[self.direction]
+    def step(self, track: Track):
+        state = HEADING_INDEX[self.direction] * TURN_STATES + self.intersections % TURN_STATES
+        position = track.encode(self.position) + track.moves[state]
+        cell = track.cells[position]
+        state = TRANSITIONS[cell, state // TURN_STATES, state % TURN_STATES]
+        if state == DERAILED:
+            raise DerailedError(f"Cart left the track at {track.decode(position)}.")
+        self.position = track.decode(position)
+        self.direction = HEADINGS[state // TURN_STATES]
+        self.intersections += cell == INTERSECTION_TRACK
 
     def collides(self, other: 'Cart') -> bool:
         return self is not other and self.ok and other.ok and self.position == other.position
 
 
 class CartsController:
-    """A controller which moves carts along a track."""
-    def __init__(self, chart: List[str]):
-        self.grid: Dict[Point, str] = defaultdict(str)
-        self.carts: List[Cart] = []
-        self.populate(chart)
-        self.surviving_carts: List[Cart] = self.carts[:]
-        self.collisions: Dict[Point, Tuple[Cart, Cart]] = {}
+    """A controller which moves carts along a track.
+
+    Carts are stored as a structure of arrays indexed by cart id: an encoded
+    position and a state byte combining heading and turn counter. Positions
+    double as reading-order sort keys, and :attr:`occupied` maps each position
+    to the cart on it for O(1) collision checks. Each move is a lookup in
+    :attr:`Track.moves` followed by one in :data:`TRANSITIONS`.
+
+    Pass ``on_tick`` to receive a :class:`TickStats` after every tick. The state
+    can be checkpointed with :meth:`snapshot` and resumed with :meth:`restore`.
+    """
+    SNAPSHOT_MAGIC = b'CART'
+    SNAPSHOT_VERSION = 2
+    # magic, version, width, loops, carts, collisions
+    SNAPSHOT_HEADER = struct.Struct('<4sBIQII')
+    COLLISION = struct.Struct('<qII')
+
+    def __init__(self, chart: List[str], on_tick: Callable[[TickStats], None] = None):
+        self.track: Track = Track(chart)
+        self.positions: array = array('q', (x for x, _ in self.track.carts))
+        self.states: bytearray = bytearray(x for _, x in self.track.carts)
+        self.alive: bytearray = bytearray(b'\x01' * len(self.positions))
+        self.occupied: Dict[int, int] = {x: i for i, x in enumerate(self.positions)}
+        self.order: List[int] = list(range(len(self.positions)))
+        self.collisions: Dict[Point, Tuple[int, int]] = {}
         self.loops = 0
+        self.on_tick: Optional[Callable[[TickStats], None]] = on_tick
 
     @property
     def first_collision(self):
@@ -83,29 +202,121 @@ class CartsController:
             return next(iter(self.collisions.items()))
 
     @property
-    def final_cart(self):
-        if len(self.surviving_carts) == 1:
-            return self.surviving_carts[-1]
-
-    def populate(self, chart: List[str]):
-        for y, row in enumerate(chart):
-            for x, icon in enumerate(row):
-                point = Point(x, y)
-                self.grid[point] = icon
-                if icon in DIRECTION_MAP:
-                    self.carts.append(Cart(point, DIRECTION_MAP[icon]))
-        self.carts.sort()
+    def surviving_carts(self) -> List[Cart]:
+        return [self.get_cart(x) for x in self.order]
+
+    @property
+    def final_cart(self) -> Optional[Cart]:
+        if len(self.occupied) == 1:
+            return self.get_cart(next(iter(self.occupied.values())))
+
+    def get_cart(self, cart: int) -> Cart:
+        heading, turn = divmod(self.states[cart], TURN_STATES)
+        result = Cart(self.track.decode(self.positions[cart]), HEADINGS[heading])
+        result.intersections = turn
+        result.ok = bool(self.alive[cart])
+        return result
+
+    def advance(self, ticks: int = 1) -> int:
+        """Run up to ``ticks`` ticks, stopping early once one cart or fewer remains.
+
+        Returns
+        -------
+        The number of ticks run.
+        """
+        positions, states, alive, occupied = self.positions, self.states, self.alive, self.occupied
+        moves, transitions = self.track.moves, TRANSITIONS.tobytes()
+        cells = self.track.cells.tobytes()
+        order = self.order
+        on_tick = self.on_tick
+        tick = 0
+        start = last = time.perf_counter()
+        while tick < ticks and len(occupied) > 1:
+            collisions = 0
+            for cart in order:
+                if not alive[cart]:
+                    continue
+                position = positions[cart]
+                state = states[cart]
+                del occupied[position]
+                position += moves[state]
+                positions[cart] = position
+                other = occupied.pop(position, None)
+                if other is not None:
+                    alive[cart] = alive[other] = 0
+                    self.collisions[self.track.decode(position)] = (cart, other,)
+                    collisions += 1
+                    continue
+                occupied[position] = cart
+                state = transitions[cells[position] * CART_STATES + state]
+                if state == DERAILED:
+                    raise DerailedError(f"Cart {cart} left the track at {self.track.decode(position)}.")
+                states[cart] = state
+            # Positions are reading-order keys, so sorting the occupied cells orders the next tick.
+            order = [occupied[x] for x in sorted(occupied)]
+            tick += 1
+            if on_tick is not None:
+                now = time.perf_counter()
+                on_tick(TickStats(
+                    tick=self.loops + tick,
+                    alive=len(occupied),
+                    collisions=collisions,
+                    elapsed=now - last,
+                    ticks_per_second=tick / (now - start) if now > start else float('inf'),
+                ))
+                last = now
+        self.order = order
+        self.loops += tick
+        return tick
 
     def step(self):
-        for cart in self.surviving_carts:
-            cart.step(self.grid)
-            for other in (x for x in self.surviving_carts if x is not cart):
-                if cart.collides(other):
-                    cart.ok = other.ok = False
-                    self.collisions[cart.position] = (cart, other,)
-        self.surviving_carts = sorted(x for x in self.surviving_carts if x.ok)
+        self.advance()
+
+    def snapshot(self) -> bytes:
+        """Serialize the track and every cart into a compact, compressed binary blob."""
+        header = self.SNAPSHOT_HEADER.pack(
+            self.SNAPSHOT_MAGIC, self.SNAPSHOT_VERSION, self.track.width, self.loops,
+            len(self.positions), len(self.collisions),
+        )
+        encode = self.track.encode
+        body = b''.join((
+            self.track.cells.tobytes(),
+            self.positions.tobytes(),
+            bytes(self.states),
+            bytes(self.alive),
+            *(self.COLLISION.pack(encode(point), *carts) for point, carts in self.collisions.items()),
+        ))
+        return header + zlib.compress(body)
+
+    @classmethod
+    def restore(cls, data: bytes, on_tick: Callable[[TickStats], None] = None) -> 'CartsController':
+        """Rebuild a controller from the output of :meth:`snapshot`."""
+        magic, version, width, loops, carts, collisions = cls.SNAPSHOT_HEADER.unpack_from(data)
+        if magic != cls.SNAPSHOT_MAGIC or version != cls.SNAPSHOT_VERSION:
+            raise ValueError(f"Not a version {cls.SNAPSHOT_VERSION} cart snapshot.")
+        body = zlib.decompress(data[cls.SNAPSHOT_HEADER.size:])
+        size = len(body) - carts * (array('q').itemsize + 2) - collisions * cls.COLLISION.size
+        cells, body = body[:size], memoryview(body)[size:]
+
+        controller = cls.__new__(cls)
+        controller.track = track = Track.from_cells(np.frombuffer(cells, dtype=np.uint8), width)
+        controller.positions = array('q')
+        controller.positions.frombytes(body[:carts * controller.positions.itemsize])
+        body = body[carts * controller.positions.itemsize:]
+        controller.states = bytearray(body[:carts])
+        controller.alive = bytearray(body[carts:carts * 2])
+        controller.collisions = {
+            track.decode(position): (cart, other)
+            for position, cart, other in cls.COLLISION.iter_unpack(body[carts * 2:])
+        }
+        controller.occupied = {
+            controller.positions[x]: x for x in range(carts) if controller.alive[x]
+        }
+        controller.order = [controller.occupied[x] for x in sorted(controller.occupied)]
+        controller.loops = loops
+        controller.on_tick = on_tick
+        return controller
 
     def run(self):
-        while len(self.surviving_carts) > 1:
-            self.step()
-            self.loops += 1
+        while len(self.occupied) > 1:
+            self.advance(len(self.positions))
@@ -1,46 +1,124 @@
-from typing import List
+import pathlib
+from typing import List, Union, Sequence
 
 from dec14 import INPUT
+from util.inputs import INPUTS
 
-STOP = int(INPUT.read_text().strip())
+Target = Union[int, str, Sequence[int]]
+# The digits appended for every possible sum of two scores.
+RECIPES = tuple(bytes(int(x) for x in str(i)) for i in range(19))
 
 
 class ScoreBoard:
-    """Track the scores over time for 2 players."""
-    def __init__(self, seek: int = 10):
+    """Track the scores over time for 2 players.
+
+    Scores are single digits, so they're kept one per byte in a ``bytearray``.
+    """
+    BATCH: int = 1 << 14
+
+    def __init__(self, seek: int = 10, target: Target = None):
         self.seek = seek
-        self.scores = [3, 7]
+        self.scores = bytearray(b'\x03\x07')
         self.player1 = 0
         self.player2 = 1
+        self._target = target
+
+    @property
+    def target(self) -> bytes:
+        """The target as a string of digits, read from the puzzle input if it wasn't given."""
+        if self._target is None:
+            self._target = get_target()
+        return get_digits(self._target)
+
+    def extend(self, rounds: int):
+        """Run ``rounds`` rounds of recipe-making in a single call."""
+        scores = self.scores
+        extend = scores.extend
+        player1, player2 = self.player1, self.player2
+        for _ in range(rounds):
+            score1, score2 = scores[player1], scores[player2]
+            extend(RECIPES[score1 + score2])
+            size = len(scores)
+            player1 += score1 + 1
+            if player1 >= size:
+                player1 %= size
+            player2 += score2 + 1
+            if player2 >= size:
+                player2 %= size
+        self.player1, self.player2 = player1, player2
 
     def step(self):
         """Get new scores and move the players on the board."""
-        scores = self.scores
-        score = scores[self.player1] + scores[self.player2]
-        if score >= 10:
-            self.scores.append(1)
-        scores.append(score % 10)
-        self.player1 = (self.player1 + scores[self.player1] + 1) % len(scores)
-        self.player2 = (self.player2 + scores[self.player2] + 1) % len(scores)
-
-    def iterate(self, stop: int = STOP) -> List[int]:
+        self.extend(1)
+
+    def iterate(self, stop: int = None) -> List[int]:
         """Part 1: Find the next 10 recipes after iterating for ``stop``
 
         To do this we iterate another 10 times and return that.
         """
+        if stop is None:
+            stop = int(''.join(str(x) for x in self.target))
+        # Every round makes at least one recipe, so this never overshoots by much.
         while len(self.scores) < stop + self.seek:
-            self.step()
-        return self.scores[stop:stop + self.seek]
+            self.extend(stop + self.seek - len(self.scores))
+        return list(self.scores[stop:stop + self.seek])
 
-    def num_scores(self, stop: int = STOP) -> int:
-        """Part 2: Move the scoreboard 1 step at a time until the pattern provided by ``stop`` is matched
+    def num_scores(self, stop: Target = None) -> int:
+        """Part 2: Make recipes until the pattern provided by ``stop`` is matched
 
-        Return the number of recipes made.
+        Return the number of recipes made before the pattern. Pass a string or a
+        sequence of digits to search for a pattern with leading zeros.
         """
-        digits = [int(x) for x in str(stop)]
-        while True:
-            self.step()
-            if self.scores[-len(digits) - 1:-1] == digits:
-                return len(self.scores) - len(digits) - 1
-            if self.scores[-len(digits):] == digits:
-                return len(self.scores) - len(digits)
+        matcher = StreamMatcher(self.target if stop is None else get_digits(stop))
+        found = matcher.scan(self.scores)
+        while found is None:
+            self.extend(self.BATCH)
+            found = matcher.scan(self.scores)
+        return found
+
+
+class StreamMatcher:
+    """Find the first occurrence of ``pattern`` in a buffer that only grows.
+
+    Each :meth:`scan` only searches the bytes appended since the last call, plus
+    enough of the tail to catch a match straddling the boundary. The search
+    itself is ``bytearray.find``, which runs in C.
+    """
+    def __init__(self, pattern: bytes):
+        self.pattern = pattern
+        self.scanned = 0
+
+    def scan(self, buffer: bytearray):
+        start = max(self.scanned - len(self.pattern) + 1, 0)
+        self.scanned = len(buffer)
+        found = buffer.find(self.pattern, start)
+        return found if found >= 0 else None
+
+
+def get_digits(target: Target) -> bytes:
+    """Convert a target into one byte per digit."""
+    if isinstance(target, int):
+        target = str(target)
+    if isinstance(target, str):
+        target = target.strip()
+        if not target.isdigit():
+            raise ValueError(f"<{target}> is not a string of digits.")
+        return bytes(int(x) for x in target)
+    target = bytes(target)
+    if not target or max(target) > 9:
+        raise ValueError(f"<{list(target)}> is not a sequence of digits.")
+    return target
+
+
+def get_target(path: pathlib.Path = INPUT) -> str:
+    return INPUTS.read(path).strip()
+
+
+def get_answer1(path: pathlib.Path = INPUT) -> str:
+    board = ScoreBoard(target=get_target(path))
+    return ''.join(str(x) for x in board.iterate())
+
+
+def get_answer2(path: pathlib.Path = INPUT) -> int:
+    board = ScoreBoard(target=get_target(path))
+    return board.num_scores()
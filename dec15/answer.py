@@ -1,28 +1,80 @@
+import copy
 import dataclasses
-import heapq
+import json
 import pathlib
-from itertools import count
+import time
+from concurrent.futures import ProcessPoolExecutor
 from functools import total_ordering
+from itertools import repeat
 from operator import attrgetter
-from typing import List, Set, Union
+from typing import List, Union, Tuple, Dict, Iterable, NamedTuple, Callable, Optional, TextIO, \
+    Iterator
 
 from dec15 import INPUT
-from util.containers import Point, CardinalDirections
-from util.helpers import manhattan_distance
+from util.containers import Grid, Point
 
 positiongetter = attrgetter('position')
 
+WALL = ord('#')
+OPEN = ord('.')
+ENEMIES = {'E': 'G', 'G': 'E'}
+
 
 class DeadSoldierError(Exception):
     pass
 
 
+class Event(NamedTuple):
+    """Something that happened during a battle.
+
+    - ``move``: a ``team`` unit moved from ``source`` to ``target``.
+    - ``attack``: a ``team`` unit at ``source`` hit the unit at ``target``, leaving it ``hp``.
+    - ``death``: a ``team`` unit died at ``source``.
+    """
+    round: int
+    kind: str
+    team: str
+    source: Point
+    target: Optional[Point] = None
+    hp: Optional[int] = None
+
+
+class RoundProfile(NamedTuple):
+    """Where the time went in one round. ``nodes`` holds the cells expanded by each BFS."""
+    round: int
+    complete: bool
+    pathfinding: float
+    attacks: float
+    nodes: Tuple[int, ...]
+
+
+class CombatLog:
+    """Record a battle's events as JSON lines, for replaying or benchmarking later."""
+
+    def __init__(self, file: TextIO):
+        self.file = file
+
+    def __call__(self, event: Event):
+        self.file.write(json.dumps(event._asdict(), separators=(',', ':')) + '\n')
+
+    @staticmethod
+    def read(file: TextIO) -> Iterator[Event]:
+        for line in file:
+            event = json.loads(line)
+            for key in ('source', 'target'):
+                if event[key] is not None:
+                    event[key] = Point(*event[key])
+            yield Event(**event)
+
+
 @total_ordering
 @dataclasses.dataclass
 class Soldier:
     team: str
     position: Point
     hp: int = 200
+    # The flat index of ``position`` on the battlefield.
+    cell: int = -1
 
     def __lt__(self, other: 'Soldier') -> bool:
         if self.hp == other.hp:
@@ -35,9 +87,28 @@ class Soldier:
 
 
 class TableTopGame:
+    """Simulate a battle between elves and goblins.
+
+    Positions are ``Point(y, x)`` so they sort in reading order. Each cell also
+    has a flat index ``y * width + x``, which sorts the same way.
+    :attr:`neighbors` lists the non-wall neighbors of every cell in reading order.
 
-    def __init__(self, lines, elf_attack=None):
+    The battlefield is a flat ``bytearray`` of icons (``#``, ``.``, ``E``, ``G``)
+    and :attr:`occupants` maps each cell to the unit standing on it. Both are
+    updated in place as units move and die.
+
+    Pass ``on_event`` (e.g. a :class:`CombatLog`) to receive every :class:`Event`,
+    and ``on_round`` to receive a :class:`RoundProfile` after every round. Hooks
+    aren't copied or pickled along with the game.
+    """
+
+    def __init__(self, lines, elf_attack=None, on_event: Callable[[Event], None] = None,
+                 on_round: Callable[[RoundProfile], None] = None):
         self.elf_attack = elf_attack
+        self.on_event = on_event
+        self.on_round = on_round
+        # The number of cells expanded by the last search in plan(), None if get_move() didn't search
+        self.expanded: Optional[int] = None
         self.walls = set()
         self.units = []
         self.rounds = 0
@@ -45,8 +116,16 @@ class TableTopGame:
         self.right = None
         self.top = None
         self.bottom = None
+        self.width = 0
+        self.neighbors: List[Tuple[int, ...]] = []
+        self.cells: bytearray = bytearray()
+        self.occupants: List[Union[Soldier, None]] = []
+        self.alive: Dict[str, int] = {'E': 0, 'G': 0}
         self.populate(lines)
 
+    def __getstate__(self):
+        return {**self.__dict__, 'on_event': None, 'on_round': None}
+
     def populate(self, lines: List[str]):
         for y, line in enumerate(lines):
             for x, icon in enumerate(line.strip()):
@@ -58,6 +137,31 @@ class TableTopGame:
         self.right = max(x for y, x in self.walls)
         self.top = min(y for y, x in self.walls)
         self.bottom = max(y for y, x in self.walls)
+        # Pad the width so the left and right neighbors never wrap around a row.
+        self.width = width = self.right + 2
+        size = (self.bottom + 1) * width
+        self.cells = cells = bytearray(b'#' * size)
+        for y, line in enumerate(lines):
+            line = line.strip().encode('ascii')
+            cells[y * width:y * width + len(line)] = line
+        self.occupants = [None] * size
+        for unit in self.units:
+            unit.cell = self.index(unit.position)
+            self.occupants[unit.cell] = unit
+            self.alive[unit.team] += 1
+        offsets = Grid(width, self.bottom + 1).offsets
+        self.neighbors = [
+            tuple(i + o for o in offsets if 0 <= i + o < size and cells[i + o] != WALL)
+            if cells[i] != WALL else ()
+            for i in range(size)
+        ]
+
+    def index(self, position: Point) -> int:
+        y, x = position
+        return y * self.width + x
+
+    def point(self, index: int) -> Point:
+        return Point(*divmod(index, self.width))
 
     def xrange(self):
         return range(self.left, self.right + 1)
@@ -91,104 +195,100 @@ class TableTopGame:
     def total_hp(self):
         return sum(x.hp for x in self.units if x.hp > 0)
 
-    def occupied_positions(self, unit=None) -> Set[Point]:
-        units = set(x.position for x in self.units if x != unit and x.hp > 0)
-        return self.walls | units
-
-    def shortest_paths(self, source: Point, targets: Set[Point], occupied: Set[Point]) \
-            -> List[List[Point]]:
-        result, best, visited, queue = [], None, set(), [(0, 0, [source])]
-        while queue:
-            _, distance, path = heapq.heappop(queue)
-            # Check if we have the best option
-            if best and len(path) > best:
-                return result
-            # Check if this node is a candidate
-            node: Point = path[-1]
-            if node in targets:
-                result.append(path)
-                best = len(path)
-                continue
-            # Ignore nodes we've already seen
-            if node in visited:
-                continue
-            visited.add(node)
-            # Finally, check if we need to push a new entry to the queue
-            for neighbor in self.get_adjacent({node}):
-                if neighbor in occupied:
-                    continue
-                if neighbor in visited:
-                    continue
-
-                heapq.heappush(queue, (distance + 1, distance + 1, list(path) + [neighbor]))
-
-        return result
-
-    @staticmethod
-    def get_adjacent(positions: Set[Point]) -> Set[Point]:
-        return set(
-            point + direction for point in positions for direction in (
-                x.value for x in CardinalDirections
-            )
-        )
-
-    def choose_target(self, position: Point, targets: Set[Point], occupied: Set[Point]) -> \
-            Union[Point, None]:
-        if not targets:
+    def plan(self, source: int, enemy: int) -> Union[int, None]:
+        """Choose the first step from ``source`` towards the nearest cell in range of an enemy.
+
+        A breadth-first search from ``source`` over open cells labels each reachable
+        cell with its distance in a flat array, stopping at the first layer with a
+        cell next to an ``enemy``. That layer's first cell in reading order is the
+        target. Walking back from the target through the distance layers finds every
+        cell on a shortest path; of those next to ``source``, the first in reading
+        order is the step.
+
+        Returns ``None`` if nothing is reachable, or ``source`` if it's already in range.
+        """
+        neighbors, cells = self.neighbors, self.cells
+        self.expanded = 0
+        if any(cells[x] == enemy for x in neighbors[source]):
+            return source
+        distance = [-1] * len(neighbors)
+        distance[source] = 0
+        frontier = [source]
+        found = None
+        steps = 0
+        while frontier and not found:
+            self.expanded += len(frontier)
+            steps += 1
+            layer = []
+            for node in frontier:
+                for neighbor in neighbors[node]:
+                    if distance[neighbor] < 0 and cells[neighbor] == OPEN:
+                        distance[neighbor] = steps
+                        layer.append(neighbor)
+            found = [x for x in layer if any(cells[n] == enemy for n in neighbors[x])]
+            frontier = layer
+        if not found:
             return None
-        if position in targets:
-            return position
-        paths = self.shortest_paths(position, targets, occupied)
-        ends = [x[-1] for x in paths]
-        return min(ends) if ends else None
-
-    def choose_move(self, position: Point, target: Point, occupied: Set[Point]) -> Union[Point, None]:
-        if position == target:
-            return position
-        paths = self.shortest_paths(position, {target}, occupied)
-        starts = [x[1] for x in paths]
-        return min(starts) if starts else None
+
+        on_path = {min(found)}
+        for level in range(steps - 1, 0, -1):
+            on_path = {x for node in on_path for x in neighbors[node] if distance[x] == level}
+        return min(on_path)
 
     def get_move(self, unit: Soldier) -> Union[Point, None]:
-        occupied = self.occupied_positions(unit)
-        # Get all the enemies still alive
-        targets = set(x.position for x in self.units if x.team != unit.team and x.hp > 0)
-        # No valid moves
-        if not targets:
+        self.expanded = None
+        # No enemies left, no valid moves
+        if not self.alive[ENEMIES[unit.team]]:
             return None
 
-        # Everyone we can hit
-        in_range = self.get_adjacent(targets) - occupied
-        target = self.choose_target(unit.position, in_range, occupied)
+        move = self.plan(unit.cell, ord(ENEMIES[unit.team]))
         # Nothing to do, just pass this turn
-        if target is None:
+        if move is None or move == unit.cell:
             return unit.position
-
-        move = self.choose_move(unit.position, target, occupied)
-        return move
+        return self.point(move)
+
+    def move(self, unit: Soldier, position: Point):
+        cell = self.index(position)
+        if cell == unit.cell:
+            return
+        if self.on_event:
+            self.on_event(Event(self.rounds + 1, 'move', unit.team, unit.position, position))
+        self.cells[unit.cell] = OPEN
+        self.occupants[unit.cell] = None
+        self.cells[cell] = ord(unit.team)
+        self.occupants[cell] = unit
+        unit.position = position
+        unit.cell = cell
+
+    def kill(self, unit: Soldier):
+        if self.on_event:
+            self.on_event(Event(self.rounds + 1, 'death', unit.team, unit.position))
+        self.cells[unit.cell] = OPEN
+        self.occupants[unit.cell] = None
+        self.alive[unit.team] -= 1
 
     def get_attack(self, unit: Soldier) -> Union[Soldier, None]:
-        units = [
-            x for x in self.units
-            if x.team != unit.team and x.hp > 0
-            and manhattan_distance(unit.position, x.position) == 1
-        ]
+        enemy, occupants = ord(ENEMIES[unit.team]), self.occupants
+        units = [occupants[x] for x in self.neighbors[unit.cell] if self.cells[x] == enemy]
         return min(units) if units else None
 
     def run_attack(self, unit: Soldier):
         attack = self.get_attack(unit)
         if attack:
-            if self.elf_attack:
-                if unit.team == 'G':
-                    attack.hp -= 3
-                    if attack.hp <= 0:
-                        raise DeadSoldierError
-                else:
-                    attack.hp -= self.elf_attack
-            else:
-                attack.hp -= 3
+            attack.hp -= self.elf_attack if self.elf_attack and unit.team == 'E' else 3
+            if self.on_event:
+                self.on_event(
+                    Event(self.rounds + 1, 'attack', unit.team, unit.position, attack.position, attack.hp)
+                )
+            if attack.hp <= 0:
+                # When searching for the elves' attack power, any elf death ends the battle.
+                if self.elf_attack and attack.team == 'E':
+                    raise DeadSoldierError
+                self.kill(attack)
 
     def step(self) -> bool:
+        if self.on_round:
+            return self._profile_step()
         self.units.sort(key=positiongetter)
         for unit in self.units:
             # This dude's dead
@@ -198,12 +298,39 @@ class TableTopGame:
             # This dude is useless
             if move is None:
                 return False
-            unit.position = move
+            self.move(unit, move)
             # Attack!
             self.run_attack(unit)
         self.rounds += 1
         return True
 
+    def _profile_step(self) -> bool:
+        """Same as :meth:`step`, but timing pathfinding and attacks separately."""
+        clock = time.perf_counter
+        pathfinding = attacks = 0.0
+        nodes = []
+        complete = True
+        self.units.sort(key=positiongetter)
+        for unit in self.units:
+            if unit.hp <= 0:
+                continue
+            start = clock()
+            move = self.get_move(unit)
+            pathfinding += clock() - start
+            if self.expanded is not None:
+                nodes.append(self.expanded)
+            if move is None:
+                complete = False
+                break
+            self.move(unit, move)
+            start = clock()
+            self.run_attack(unit)
+            attacks += clock() - start
+        self.on_round(RoundProfile(self.rounds + 1, complete, pathfinding, attacks, tuple(nodes)))
+        if complete:
+            self.rounds += 1
+        return complete
+
     def run(self):
         while self.step():
             continue
@@ -216,12 +343,58 @@ def get_answer1(path: pathlib.Path = INPUT) -> int:
     return rounds * hp
 
 
-def get_answer2(path: pathlib.Path = INPUT) -> int:
-    lines = [x for x in path.read_text().split('\n') if x]
-    for elf_attack in count(4):
-        try:
-            rounds, hp = TableTopGame(lines, elf_attack).run()
-            return rounds * hp
-        except DeadSoldierError:
-            pass
+def fight(game: TableTopGame, elf_attack: int) -> Union[int, None]:
+    """Play out a copy of ``game`` with the given elf attack power.
+
+    Returns the outcome, or ``None`` as soon as an elf dies.
+    """
+    game = copy.deepcopy(game)
+    game.elf_attack = elf_attack
+    try:
+        rounds, hp = game.run()
+    except DeadSoldierError:
+        return None
+    return rounds * hp
 
+
+def sweep_elf_attack(game: TableTopGame, start: int = 4, workers: int = None) -> Tuple[int, int]:
+    """Find the lowest elf attack power, from ``start`` up, at which no elf dies.
+
+    Elf survival only improves as attack power goes up, so we probe exponentially
+    (``start``, ``start + 1``, ``start + 3``, ``start + 7``, ...) until the elves
+    survive, then narrow the gap with a binary search. With ``workers``, each round
+    of probing or searching tries ``workers`` powers at once in a process pool.
+
+    Returns
+    -------
+    The attack power and the outcome of that battle.
+    """
+    batch = workers if workers and workers > 1 else 1
+    executor = ProcessPoolExecutor(max_workers=batch) if batch > 1 else None
+    outcomes: Dict[int, Union[int, None]] = {}
+
+    def probe(attacks: Iterable[int]) -> Tuple[int, Union[int, None]]:
+        attacks = [x for x in attacks if x not in outcomes]
+        fights = executor.map if executor else map
+        outcomes.update(zip(attacks, fights(fight, repeat(game), attacks)))
+        won = [x for x in outcomes if outcomes[x] is not None]
+        return max((x for x in outcomes if outcomes[x] is None), default=start - 1), min(won, default=None)
+
+    try:
+        lost, won, exponent = start - 1, None, 0
+        while won is None:
+            lost, won = probe(start + 2 ** x - 1 for x in range(exponent, exponent + batch))
+            exponent += batch
+        while won - lost > 1:
+            gap = won - lost
+            lost, won = probe(sorted({lost + gap * x // (batch + 1) for x in range(1, batch + 1)} - {lost}))
+    finally:
+        if executor:
+            executor.shutdown()
+    return won, outcomes[won]
+
+
+def get_answer2(path: pathlib.Path = INPUT, workers: int = None) -> int:
+    lines = [x for x in path.read_text().split('\n') if x]
+    elf_attack, outcome = sweep_elf_attack(TableTopGame(lines), workers=workers)
+    return outcome
@@ -2,12 +2,16 @@ import dataclasses
 import pathlib
 import re
 
-from typing import NamedTuple, Tuple, NewType, List
+import numpy as np
+
+from typing import NamedTuple, Tuple, NewType, List, Callable, Dict, Mapping, Union, Sequence, Set, \
+    Optional
 
 from dec16 import INPUT, INPUT2
-from util.helpers import load_values_list, Values, chunks, flatten_iter
+from util.helpers import load_values_list, Values, chunks
 
 Registers = NewType('Registers', List[int])
+Operation = NewType('Operation', Callable[[Registers, int, int, int], None])
 
 
 PATTERN = re.compile(r'\d+')
@@ -76,6 +80,80 @@ class VirtualMemory:
     }
 
 
+# The same operations as :class:`VirtualMemory`, but working on a plain list of registers.
+# These are what decoded programs run, so there's no attribute lookup or dunder call per access.
+
+def addr(r: Registers, a: int, b: int, c: int):
+    r[c] = r[a] + r[b]
+
+
+def addi(r: Registers, a: int, b: int, c: int):
+    r[c] = r[a] + b
+
+
+def mulr(r: Registers, a: int, b: int, c: int):
+    r[c] = r[a] * r[b]
+
+
+def muli(r: Registers, a: int, b: int, c: int):
+    r[c] = r[a] * b
+
+
+def banr(r: Registers, a: int, b: int, c: int):
+    r[c] = r[a] & r[b]
+
+
+def bani(r: Registers, a: int, b: int, c: int):
+    r[c] = r[a] & b
+
+
+def borr(r: Registers, a: int, b: int, c: int):
+    r[c] = r[a] | r[b]
+
+
+def bori(r: Registers, a: int, b: int, c: int):
+    r[c] = r[a] | b
+
+
+def setr(r: Registers, a: int, b: int, c: int):
+    r[c] = r[a]
+
+
+def seti(r: Registers, a: int, b: int, c: int):
+    r[c] = a
+
+
+def gtir(r: Registers, a: int, b: int, c: int):
+    r[c] = int(a > r[b])
+
+
+def gtri(r: Registers, a: int, b: int, c: int):
+    r[c] = int(r[a] > b)
+
+
+def gtrr(r: Registers, a: int, b: int, c: int):
+    r[c] = int(r[a] > r[b])
+
+
+def eqir(r: Registers, a: int, b: int, c: int):
+    r[c] = int(a == r[b])
+
+
+def eqri(r: Registers, a: int, b: int, c: int):
+    r[c] = int(r[a] == b)
+
+
+def eqrr(r: Registers, a: int, b: int, c: int):
+    r[c] = int(r[a] == r[b])
+
+
+OPERATIONS: Dict[str, Operation] = {
+    x.__name__: x for x in (
+        addr, addi, mulr, muli, banr, bani, borr, bori, setr, seti, gtir, gtri, gtrr, eqir, eqri, eqrr
+    )
+}
+
+
 class Instruction(NamedTuple):
     opcode: int
     a: int
@@ -84,6 +162,24 @@ class Instruction(NamedTuple):
 
 
 State = NewType('State', Tuple[int, int, int, int])
+Decoded = NewType('Decoded', List[Tuple[Operation, int, int, int]])
+
+
+def decode(instructions: Sequence[Instruction], opcodes: Mapping[Union[int, str], str] = None) -> Decoded:
+    """Resolve every instruction to its operation function ahead of time.
+
+    Parameters
+    ----------
+    instructions
+        The program. Opcodes are either numbers (resolved through ``opcodes``) or
+        operation names.
+    opcodes : optional
+        A mapping of numeric opcode -> operation name.
+    """
+    return [
+        (OPERATIONS[opcodes[x.opcode] if opcodes else x.opcode], x.a, x.b, x.c)
+        for x in instructions
+    ]
 
 
 @dataclasses.dataclass
@@ -92,15 +188,138 @@ class InstructionSet:
     instruction: Instruction
     after: State
 
-    def __post_init__(self):
-        registers: Registers = list(self.before)
-        self.memory = VirtualMemory(registers)
-        self.candidates = set()
-        for operation in VirtualMemory.operations:
-            local = VirtualMemory(registers[:])
-            getattr(local, operation.__name__)(*self.instruction[1:])
-            if local.registers == list(self.after):
-                self.candidates.add(operation.__name__)
+    @property
+    def candidates(self) -> Set[str]:
+        """The names of the operations that turn ``before`` into ``after``."""
+        _, (mask,) = candidate_masks([self])
+        return {name for bit, name in enumerate(OPERATION_NAMES) if mask >> bit & 1}
+
+
+# Every operation as (ufunc, kind of A, kind of B), where a kind is 'r'egister or 'i'mmediate.
+# The set operations ignore B.
+VECTOR_OPERATIONS = {
+    'addr': (np.add, 'r', 'r'),
+    'addi': (np.add, 'r', 'i'),
+    'mulr': (np.multiply, 'r', 'r'),
+    'muli': (np.multiply, 'r', 'i'),
+    'banr': (np.bitwise_and, 'r', 'r'),
+    'bani': (np.bitwise_and, 'r', 'i'),
+    'borr': (np.bitwise_or, 'r', 'r'),
+    'bori': (np.bitwise_or, 'r', 'i'),
+    'setr': (np.positive, 'r', None),
+    'seti': (np.positive, 'i', None),
+    'gtir': (np.greater, 'i', 'r'),
+    'gtri': (np.greater, 'r', 'i'),
+    'gtrr': (np.greater, 'r', 'r'),
+    'eqir': (np.equal, 'i', 'r'),
+    'eqri': (np.equal, 'r', 'i'),
+    'eqrr': (np.equal, 'r', 'r'),
+}
+# Bit ``i`` of a candidate mask stands for ``OPERATION_NAMES[i]``.
+OPERATION_NAMES = tuple(VECTOR_OPERATIONS)
+ALL_OPERATIONS = (1 << len(OPERATION_NAMES)) - 1
+
+
+class AmbiguousOpcodesError(ValueError):
+    """The samples don't pin every opcode to exactly one operation."""
+    def __init__(self, message: str, candidates: Dict[int, Set[str]]):
+        super().__init__(message)
+        self.candidates = candidates
+
+
+def candidate_masks(examples: Sequence[InstructionSet]) -> Tuple[np.ndarray, np.ndarray]:
+    """Evaluate all 16 operations on all samples at once.
+
+    Returns the opcode of every sample and a mask of the operations that
+    reproduce its ``after`` registers (see :data:`OPERATION_NAMES`).
+    """
+    before = np.array([x.before for x in examples], dtype=np.int64).reshape(-1, 4)
+    after = np.array([x.after for x in examples], dtype=np.int64).reshape(-1, 4)
+    opcodes, a, b, c = np.array([x.instruction for x in examples], dtype=np.int64).reshape(-1, 4).T
+    rows = np.arange(len(before))
+    size = before.shape[1]
+
+    # Every register other than C has to come through untouched.
+    unchanged = before == after
+    valid_c = c < size
+    unchanged[rows, np.where(valid_c, c, 0)] = True
+    unchanged = unchanged.all(axis=1) & valid_c
+    target = after[rows, np.where(valid_c, c, 0)]
+
+    def operand(kind, values):
+        if kind == 'r':
+            return before[rows, np.where(values < size, values, 0)], values < size
+        return values, True
+
+    masks = np.zeros(len(before), dtype=np.uint16)
+    for bit, (function, kind_a, kind_b) in enumerate(VECTOR_OPERATIONS.values()):
+        value_a, valid_a = operand(kind_a, a)
+        if kind_b is None:
+            value, valid = function(value_a), valid_a
+        else:
+            value_b, valid_b = operand(kind_b, b)
+            value, valid = function(value_a, value_b), valid_a & valid_b
+        matches = unchanged & valid & (value.astype(np.int64) == target)
+        masks |= matches.astype(np.uint16) << bit
+    return opcodes, masks
+
+
+def count_bits(masks: np.ndarray) -> np.ndarray:
+    """Population count of every mask."""
+    bits = (masks[:, None] >> np.arange(len(OPERATION_NAMES), dtype=np.uint16)) & 1
+    return bits.sum(axis=1)
+
+
+def _augment(opcode: int, masks: Dict[int, int], owners: Dict[int, int], visited: Set[int]) -> bool:
+    """Find an augmenting path from ``opcode`` (Kuhn's algorithm)."""
+    for bit in range(len(OPERATION_NAMES)):
+        if masks[opcode] >> bit & 1 and bit not in visited:
+            visited.add(bit)
+            if bit not in owners or _augment(owners[bit], masks, owners, visited):
+                owners[bit] = opcode
+                return True
+    return False
+
+
+def _match(masks: Dict[int, int]) -> Optional[Dict[int, int]]:
+    """A complete opcode -> operation bit matching, if there is one."""
+    owners = {}
+    for opcode in masks:
+        if not _augment(opcode, masks, owners, set()):
+            return None
+    return {opcode: bit for bit, opcode in owners.items()}
+
+
+def resolve_opcodes(examples: Sequence[InstructionSet]) -> Dict[int, str]:
+    """Map every opcode seen in the samples to the name of its operation.
+
+    The candidate masks of all the samples of an opcode are intersected, and the
+    opcodes are matched to operations as a bipartite matching. Raise
+    :class:`AmbiguousOpcodesError` if there is no matching, or more than one.
+    """
+    opcodes, masks = candidate_masks(examples)
+    narrowed = {
+        int(opcode): int(np.bitwise_and.reduce(masks[opcodes == opcode]))
+        for opcode in np.unique(opcodes)
+    }
+
+    def describe(mapping: Dict[int, int]) -> Dict[int, Set[str]]:
+        return {
+            opcode: {name for bit, name in enumerate(OPERATION_NAMES) if mask >> bit & 1}
+            for opcode, mask in mapping.items()
+        }
+
+    matching = _match(narrowed)
+    if matching is None:
+        raise AmbiguousOpcodesError("No operation assignment fits every sample.", describe(narrowed))
+    # The matching is unique only if no opcode can be moved off its operation.
+    for opcode, bit in matching.items():
+        if narrowed[opcode] != 1 << bit and _match({**narrowed, opcode: narrowed[opcode] & ~(1 << bit)}):
+            raise AmbiguousOpcodesError(
+                f"Opcode {opcode} has more than one consistent operation.", describe(narrowed)
+            )
+
+    return {opcode: OPERATION_NAMES[bit] for opcode, bit in sorted(matching.items())}
 
 
 @dataclasses.dataclass
@@ -111,22 +330,13 @@ class VirtualMemoryController:
     def __post_init__(self):
         self.opcodes = self.resolve_opcodes()
 
-    def resolve_opcodes(self):
-        found = {}
-        candidates = set(flatten_iter(x.candidates for x in self.examples if len(x.candidates) > 1))
-        while candidates:
-            for operation in self.examples:
-                operation.candidates -= set(found.values())
-                if len(operation.candidates) == 1:
-                    found[operation.instruction.opcode] = operation.candidates.pop()
-            candidates -= set(found.values())
-
-        return found
+    def resolve_opcodes(self) -> Dict[int, str]:
+        return resolve_opcodes(self.examples)
 
     def run(self, instructions: List[Instruction]):
-        for instruction in instructions:
-            operation = self.opcodes[instruction.opcode]
-            getattr(self.memory, operation)(instruction.a, instruction.b, instruction.c)
+        registers = self.memory.registers
+        for operation, a, b, c in decode(instructions, self.opcodes):
+            operation(registers, a, b, c)
 
 
 def load_examples(path: pathlib.Path = INPUT) -> List[InstructionSet]:
@@ -152,9 +362,9 @@ def load_instructions(path: pathlib.Path = INPUT2) -> List[Instruction]:
 
 
 def get_answer1(path: pathlib.Path = INPUT):
-    examples = load_examples(path)
+    _, masks = candidate_masks(load_examples(path))
 
-    return len([x for x in examples if len(x.candidates) > 2])
+    return int(np.count_nonzero(count_bits(masks) > 2))
 
 
 def get_answer2(input: pathlib.Path = INPUT, input2: pathlib.Path = INPUT2) -> VirtualMemoryController:
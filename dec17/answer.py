@@ -3,6 +3,8 @@ import pathlib
 import re
 from itertools import product
 
+import numpy as np
+
 from typing import NamedTuple, Tuple, NewType, List, Union
 
 from dec17 import INPUT
@@ -36,34 +38,57 @@ class Vector:
         if isinstance(item, Vector):
             return bool(self.x & item.x and self.y & item.y)
         elif isinstance(item, tuple):
-            any(x == item for x in self)
+            x, y = item
+            return x in self.x and y in self.y
         else:
-            super().__contains__(item)
+            return item in self.x or item in self.y
 
 
 def default_vector():
     return Vector(OrderedSet(), OrderedSet())
 
 
+# Tile states of a VectorMap grid
+SAND = 0
+CLAY = 1
+FLOWING = 2
+STILL = 3
+ICONS = '.#|~'
+SPRING = Point(500, 0)
+
+
 @dataclasses.dataclass
 class VectorMap:
+    """A scan of the ground as a ``uint8`` grid of tile states.
+
+    Rows run from y=0 (the spring) to the lowest clay. Columns run from one left
+    of the leftmost clay to one right of the rightmost, so water can spill past
+    either edge; ``offset`` is the x of column 0.
+    """
     boundaries: List[Vector]
+    spring: Point = SPRING
 
     def __post_init__(self):
-        self.grid = {}
-        ys = []
-        xs = []
+        self.left = min(min(x.x) for x in self.boundaries)
+        self.right = max(max(x.x) for x in self.boundaries)
+        self.top = min(min(x.y) for x in self.boundaries)
+        self.bottom = max(max(x.y) for x in self.boundaries)
+        self.offset = min(self.left, self.spring.x) - 1
+        width = max(self.right, self.spring.x) + 2 - self.offset
+        self.grid = np.zeros((self.bottom + 1, width), dtype=np.uint8)
         for vector in self.boundaries:
-            ys.extend(vector.y)
-            xs.extend(vector.x)
-        self.left = min(xs)
-        self.right = max(xs)
-        self.top = min(ys)
-        self.bottom = max(ys)
-        self.grid = {tup: vector for vector in self.boundaries for tup in vector}
-        self.available_area = OrderedSet(
-            tup for tup in product(self.xrange(), self.yrange()) if tup not in self.grid
-        )
+            rows = slice(min(vector.y), max(vector.y) + 1)
+            columns = slice(min(vector.x) - self.offset, max(vector.x) + 1 - self.offset)
+            self.grid[rows, columns] = CLAY
+
+    @property
+    def available_area(self) -> OrderedSet:
+        """Every tile within the clay's bounding box that isn't clay."""
+        return OrderedSet(tup for tup in product(self.xrange(), self.yrange()) if self[tup] != CLAY)
+
+    def __getitem__(self, item: Tuple[int, int]) -> int:
+        x, y = item
+        return self.grid[y, x - self.offset]
 
     def xrange(self):
         return range(self.left, self.right + 1)
@@ -71,12 +96,63 @@ class VectorMap:
     def yrange(self):
         return range(self.top, self.bottom + 1)
 
+    def flow(self) -> 'VectorMap':
+        """Let the water run from the spring until nothing changes.
+
+        Every stream is a (column, row) on a stack. A stream falls until it lands on
+        something, then spreads sideways. A row that's walled in on both sides fills
+        with still water and the stream rises to spread over it; otherwise the row
+        flows and each open side becomes a new falling stream.
+        """
+        grid = self.grid
+        bottom = len(grid) - 1
+        supports = (CLAY, STILL)
+        streams = [(self.spring.x - self.offset, self.spring.y)]
+        while streams:
+            x, y = streams.pop()
+            if y > self.spring.y and grid[y, x] != FLOWING:
+                # A row below has filled in since this stream was queued
+                continue
+            while y < bottom and grid[y + 1, x] == SAND:
+                y += 1
+                grid[y, x] = FLOWING
+            if y == bottom or grid[y + 1, x] == FLOWING:
+                # Ran off the bottom of the scan or into another stream
+                continue
+            while True:
+                left = x
+                while grid[y + 1, left] in supports and grid[y, left - 1] != CLAY:
+                    left -= 1
+                right = x
+                while grid[y + 1, right] in supports and grid[y, right + 1] != CLAY:
+                    right += 1
+                spills = [edge for edge in (left, right) if grid[y + 1, edge] not in supports]
+                if spills:
+                    grid[y, left:right + 1] = FLOWING
+                    streams.extend((edge, y) for edge in spills if grid[y + 1, edge] == SAND)
+                    break
+                grid[y, left:right + 1] = STILL
+                # Other streams that stopped on this row can spread over it now
+                landed = np.flatnonzero(grid[y - 1, left:right + 1] == FLOWING) + left
+                streams.extend((int(edge), y - 1) for edge in landed if edge != x)
+                y -= 1
+                if y < self.spring.y:
+                    break
+                grid[y, x] = FLOWING
+        return self
+
+    def count(self, *states: int) -> int:
+        """How many tiles between the top and bottom clay are in any of ``states``."""
+        return int(np.isin(self.grid[self.top:], states).sum())
+
+    def draw(self) -> str:
+        return '\n'.join(''.join(ICONS[x] for x in row) for row in self.grid)
+
 
 def load_vectors(path: pathlib.Path = INPUT) -> List[Vector]:
     values: Values = load_values_list(path)
     vectors = []
     for value in values:
-        print(value)
         match = PATTERN.match(value)
         kwargs = {
             match.group('one'): OrderedSet([int(match.group('val'))]),
@@ -89,8 +165,11 @@ def load_vectors(path: pathlib.Path = INPUT) -> List[Vector]:
     return vectors
 
 
-def get_answer1(path: pathlib.Path = INPUT):
-    vectors = load_vectors(path)
-    vector_map = VectorMap(vectors)
+def get_answer1(path: pathlib.Path = INPUT) -> int:
+    vector_map = VectorMap(load_vectors(path)).flow()
+    return vector_map.count(FLOWING, STILL)
+
 
-    return len(vector_map.available_area)
+def get_answer2(path: pathlib.Path = INPUT) -> int:
+    vector_map = VectorMap(load_vectors(path)).flow()
+    return vector_map.count(STILL)
@@ -1,11 +1,14 @@
 import collections
 import dataclasses
+import functools
 import pathlib
 import logging
+import re
 
-from typing import Tuple, NewType, List
+from typing import Tuple, NewType, List, Callable, Optional, FrozenSet, Iterable, Iterator, NamedTuple, Dict, \
+    Counter
 
-from dec16.answer import VirtualMemory, Instruction
+from dec16.answer import VirtualMemory, Instruction, Registers, decode
 from dec19 import INPUT
 
 from util.helpers import load_values_list, Values
@@ -14,12 +17,416 @@ log = logging.getLogger(__name__)
 
 IPAddress = NewType('IPAddress', int)
 Program = NewType('Program', Tuple[IPAddress, List[Instruction]])
+Compiled = Callable[..., None]
 
 
 class Instruction(Instruction):
     opcode: str
 
 
+# Python expressions for each operation. ``A``/``B`` are register operands, ``a``/``b`` immediates.
+EXPRESSIONS = {
+    'addr': '{A} + {B}',
+    'addi': '{A} + {b}',
+    'mulr': '{A} * {B}',
+    'muli': '{A} * {b}',
+    'banr': '{A} & {B}',
+    'bani': '{A} & {b}',
+    'borr': '{A} | {B}',
+    'bori': '{A} | {b}',
+    'setr': '{A}',
+    'seti': '{a}',
+    'gtir': '1 if {a} > {B} else 0',
+    'gtri': '1 if {A} > {b} else 0',
+    'gtrr': '1 if {A} > {B} else 0',
+    'eqir': '1 if {a} == {B} else 0',
+    'eqri': '1 if {A} == {b} else 0',
+    'eqrr': '1 if {A} == {B} else 0',
+}
+REGISTER = re.compile(r'\br\d+')
+
+
+def _block(pointer: Optional[int], instructions: List[Instruction], start: int,
+           traps: FrozenSet[int] = frozenset()) -> List[str]:
+    """Straight-line source for the instructions from ``start`` up to the next jump.
+
+    While a block runs the ip is known, so reads of the ip register become constants.
+    A write to the ip register ends the block and sets the next ``ip`` to dispatch on.
+    Blocks also stop short of trapped instructions, so the trap always fires.
+    """
+    lines = []
+    for index in range(start, len(instructions)):
+        if index != start and index in traps:
+            lines.extend([f'r{pointer} = {index - 1}', f'ip = {index}'])
+            return lines
+        x = instructions[index]
+
+        def register(n: int) -> str:
+            return str(index) if n == pointer else f'r{n}'
+
+        expression = EXPRESSIONS[x.opcode].format(a=x.a, b=x.b, A=register(x.a), B=register(x.b))
+        if not REGISTER.search(expression):
+            # Only immediates and the ip are involved, so fold it now.
+            expression = str(eval(expression))
+        lines.append(f'r{x.c} = {expression}')
+        if x.c == pointer:
+            lines.append(f'ip = {int(expression) + 1}' if expression.isdigit() else f'ip = r{x.c} + 1')
+            return lines
+    if pointer is not None:
+        lines.extend([f'r{pointer} = {len(instructions) - 1}', f'ip = {len(instructions)}'])
+    return lines
+
+
+def _dispatch(blocks: List[List[str]], entries: range) -> List[str]:
+    """Pick the block for ``ip`` with a binary tree of comparisons."""
+    if len(entries) == 1:
+        return blocks[entries[0]]
+    middle = len(entries) // 2
+    return [
+        f'if ip < {entries[middle]}:',
+        *('    ' + x for x in _dispatch(blocks, entries[:middle])),
+        'else:',
+        *('    ' + x for x in _dispatch(blocks, entries[middle:])),
+    ]
+
+
+def _trap(pointer: int, instructions: List[Instruction], index: int, names: str,
+          traps: FrozenSet[int]) -> List[str]:
+    """Hand the registers to ``trap`` before running a trapped instruction.
+
+    ``trap(registers, index)`` returns the next ip, or None to run the instruction as usual.
+    """
+    return [
+        f'r{pointer} = {index}',
+        f'registers[:] = {names}',
+        f'ip = trap(registers, {index})',
+        f'{names}, = registers',
+        'if ip is None:',
+        *('    ' + x for x in _block(pointer, instructions, index, traps)),
+    ]
+
+
+def program_source(program: Program, size: int = 6, traps: FrozenSet[int] = frozenset()) -> str:
+    """Translate a program into the source of a Python function.
+
+    Every instruction starts a basic block, so any ip a jump can compute has
+    somewhere to go. The function takes a list of registers and updates it in place.
+    The instructions in ``traps`` call back into its ``trap`` argument instead.
+    """
+    pointer, instructions = program
+    names = ', '.join(f'r{i}' for i in range(size))
+    lines = ['def program(registers, trap=None):', f'    {names}, = registers']
+    if pointer is None:
+        body = _block(pointer, instructions, 0)
+    else:
+        blocks = [
+            _trap(pointer, instructions, i, names, traps) if i in traps
+            else _block(pointer, instructions, i, traps)
+            for i in range(len(instructions))
+        ]
+        body = [
+            f'ip = r{pointer}',
+            f'while 0 <= ip < {len(instructions)}:',
+            *('    ' + x for x in _dispatch(blocks, range(len(instructions)))),
+        ]
+    lines.extend('    ' + x for x in body)
+    lines.append(f'    registers[:] = {names}')
+    return '\n'.join(lines) + '\n'
+
+
+@functools.lru_cache(None)
+def _compile(pointer: Optional[int], instructions: Tuple[Instruction, ...], size: int,
+             traps: FrozenSet[int]) -> Compiled:
+    source = program_source((pointer, list(instructions)), size, traps)
+    namespace = {}
+    exec(compile(source, f'<elfcode {hash((pointer, instructions)):x}>', 'exec'), namespace)
+    return namespace['program']
+
+
+def compile_program(program: Program, size: int = 6, traps: Iterable[int] = ()) -> Compiled:
+    """Compile a program to a Python function, once per distinct program."""
+    pointer, instructions = program
+    return _compile(pointer, tuple(instructions), size, frozenset(traps))
+
+
+def divisor_sum(n: int) -> int:
+    """The sum of all divisors of ``n``, pairing each divisor below the root with its cofactor."""
+    total = 0
+    i = 1
+    while i * i <= n:
+        if n % i == 0:
+            total += i if i * i == n else i + n // i
+        i += 1
+    return total
+
+
+class DivisorSum(NamedTuple):
+    """The registers of a divisor-sum loop found in a program.
+
+    The loop adds every ``i`` in ``1..n`` with some ``j`` in ``1..n`` such that
+    ``i * j == n`` to ``total``, using ``temp`` for the comparisons.
+    """
+    start: int
+    i: int
+    j: int
+    temp: int
+    n: int
+    total: int
+
+    @property
+    def stop(self) -> int:
+        """The index of the instruction after the loop."""
+        return self.start + len(DIVISOR_SUM)
+
+    def __call__(self, registers: Registers, pointer: int) -> int:
+        """Jump over the loop, leaving the registers as the loop would have."""
+        n = registers[self.n]
+        registers[self.total] += divisor_sum(n)
+        registers[self.i] = registers[self.j] = max(n, 1) + 1
+        registers[self.temp] = 1
+        registers[pointer] = self.stop - 1
+        return self.stop
+
+
+# The divisor-sum idiom, one instruction per row. Strings are registers (``ip`` is the ip
+# register), ``'@k'`` is a jump to the k-th instruction of the idiom and None matches anything.
+DIVISOR_SUM = (
+    ('seti', 1, None, 'i'),
+    ('seti', 1, None, 'j'),
+    ('mulr', 'i', 'j', 'temp'),
+    ('eqrr', 'temp', 'n', 'temp'),
+    ('addr', 'temp', 'ip', 'ip'),
+    ('addi', 'ip', 1, 'ip'),
+    ('addr', 'i', 'total', 'total'),
+    ('addi', 'j', 1, 'j'),
+    ('gtrr', 'j', 'n', 'temp'),
+    ('addr', 'ip', 'temp', 'ip'),
+    ('seti', '@2', None, 'ip'),
+    ('addi', 'i', 1, 'i'),
+    ('gtrr', 'i', 'n', 'temp'),
+    ('addr', 'temp', 'ip', 'ip'),
+    ('seti', '@1', None, 'ip'),
+)
+COMMUTATIVE = {'addr', 'mulr', 'banr', 'borr', 'eqrr'}
+
+
+def _bind(pattern, value: int, start: int, bindings: dict) -> bool:
+    if pattern is None:
+        return True
+    if isinstance(pattern, int):
+        return pattern == value
+    if pattern.startswith('@'):
+        # seti sets the ip to one before the instruction that runs next
+        return value == start + int(pattern[1:]) - 1
+    if pattern in bindings:
+        return bindings[pattern] == value
+    registers = (v for k, v in bindings.items() if not k.startswith('#'))
+    if not pattern.startswith('#') and value in registers:
+        # Different register names are different registers
+        return False
+    bindings[pattern] = value
+    return True
+
+
+def _match_idiom(idiom, instructions: List[Instruction], start: int, pointer: int) -> Optional[dict]:
+    """Bind the registers of ``idiom`` to the instructions from ``start``, if they fit."""
+    bindings = {'ip': pointer}
+
+    def bind(patterns, values) -> bool:
+        trial = dict(bindings)
+        if all(_bind(p, v, start, trial) for p, v in zip(patterns, values)):
+            bindings.update(trial)
+            return True
+        return False
+
+    for (opcode, a, b, c), x in zip(idiom, instructions[start:start + len(idiom)]):
+        if x.opcode != opcode:
+            return None
+        if not (bind((a, b, c), x[1:]) or opcode in COMMUTATIVE and bind((b, a, c), (x.a, x.b, x.c))):
+            return None
+    return bindings if len(instructions) - start >= len(idiom) else None
+
+
+def _find_idiom(program: Program, idiom) -> Iterator[Tuple[int, dict]]:
+    """Every place ``idiom`` appears in a program, with its bindings."""
+    pointer, instructions = program
+    if pointer is None:
+        return
+    for start in range(len(instructions)):
+        bindings = _match_idiom(idiom, instructions, start, pointer)
+        if bindings is not None:
+            yield start, bindings
+
+
+def find_divisor_sums(program: Program) -> List[DivisorSum]:
+    """Find every divisor-sum loop in a program, whichever registers it uses."""
+    return [
+        DivisorSum(start, *(bindings[x] for x in DivisorSum._fields[1:]))
+        for start, bindings in _find_idiom(program, DIVISOR_SUM)
+    ]
+
+
+class Division(NamedTuple):
+    """The registers of a loop that divides by counting up.
+
+    The loop finds the smallest ``quotient`` for which ``(quotient + 1) * divisor``
+    is greater than ``dividend``, using ``temp`` for the products.
+    """
+    start: int
+    quotient: int
+    temp: int
+    dividend: int
+    divisor: int
+
+    @property
+    def stop(self) -> int:
+        """The index of the instruction after the loop."""
+        return self.start + len(DIVISION)
+
+    def __call__(self, registers: Registers, pointer: int) -> int:
+        """Jump over the loop, leaving the registers as the loop would have."""
+        registers[self.quotient] = max(registers[self.dividend], 0) // self.divisor
+        registers[self.temp] = 1
+        registers[pointer] = self.stop - 1
+        return self.stop
+
+
+# Integer division by an immediate, in the notation of DIVISOR_SUM; ``'#name'`` binds an immediate.
+DIVISION = (
+    ('seti', 0, None, 'quotient'),
+    ('addi', 'quotient', 1, 'temp'),
+    ('muli', 'temp', '#divisor', 'temp'),
+    ('gtrr', 'temp', 'dividend', 'temp'),
+    ('addr', 'temp', 'ip', 'ip'),
+    ('addi', 'ip', 1, 'ip'),
+    ('seti', '@9', None, 'ip'),
+    ('addi', 'quotient', 1, 'quotient'),
+    ('seti', '@1', None, 'ip'),
+)
+
+
+def find_divisions(program: Program) -> List[Division]:
+    """Find every division loop in a program, whichever registers it uses."""
+    return [
+        Division(start, *(bindings[x] for x in ('quotient', 'temp', 'dividend', '#divisor')))
+        for start, bindings in _find_idiom(program, DIVISION)
+        # Anything else never leaves the loop
+        if bindings['#divisor'] > 0
+    ]
+
+
+class Loop(NamedTuple):
+    """Instructions ``start..end`` repeat, jumping back ``iterations`` times."""
+    start: int
+    end: int
+    iterations: int
+    depth: int
+
+
+@dataclasses.dataclass
+class Profile:
+    """Where a program spent its steps, from :func:`profile`."""
+    program: Program
+    counts: List[int]
+    edges: Counter[Tuple[int, int]]
+    samples: Dict[int, List[Tuple[int, ...]]]
+    steps: int
+    halted: bool
+
+    @property
+    def back_edges(self) -> Counter[Tuple[int, int]]:
+        """Jumps from an instruction to itself or an earlier one, as (source, target)."""
+        return collections.Counter({k: v for k, v in self.edges.items() if k[1] <= k[0]})
+
+    @property
+    def loops(self) -> List[Loop]:
+        """One loop per back-edge target, outermost first, with its nesting depth."""
+        spans = {}
+        for (source, target), count in self.back_edges.items():
+            end, iterations = spans.get(target, (source, 0))
+            spans[target] = max(end, source), iterations + count
+        loops = []
+        for start, (end, iterations) in sorted(spans.items(), key=lambda x: (x[0], -x[1][0])):
+            depth = sum(1 for x in loops if x.start <= start and end <= x.end)
+            loops.append(Loop(start, end, iterations, depth))
+        return loops
+
+    def depth(self, index: int) -> int:
+        """How many loops contain an instruction."""
+        return sum(1 for x in self.loops if x.start <= index <= x.end)
+
+    def hot(self, n: int = 5) -> List[int]:
+        """The ``n`` most executed instructions."""
+        return sorted(range(len(self.counts)), key=lambda i: -self.counts[i])[:n]
+
+    def report(self, hot: int = 5) -> str:
+        """A table of execution counts, with loop nests drawn as bars, and register samples."""
+        _, instructions = self.program
+        lines = [f"{'ip':>4} {'count':>14} {'share':>6}  loops  instruction"]
+        for index, (count, x) in enumerate(zip(self.counts, instructions)):
+            share = count / self.steps if self.steps else 0
+            lines.append(
+                f"{index:>4} {count:>14,} {share:>6.1%}  {'|' * self.depth(index):<5}  "
+                f"{x.opcode} {x.a} {x.b} {x.c}"
+            )
+        lines.append(f"{self.steps:,} steps, {'halted' if self.halted else 'stopped at the step limit'}")
+        lines.append('')
+        lines.append("Loops:")
+        for loop in self.loops:
+            lines.append(f"{'  ' * loop.depth}{loop.start}..{loop.end}: {loop.iterations:,} iterations")
+        lines.append('')
+        lines.append("Hot instructions (* marks registers that never changed between samples):")
+        for index in self.hot(hot):
+            samples = self.samples.get(index, [])
+            constant = [len(set(x)) == 1 for x in zip(*samples)]
+            lines.append(f"{index:>4}: " + ', '.join(
+                f"r{i}{'*' if fixed else ''}={'/'.join(str(x[i]) for x in samples)}"
+                for i, fixed in enumerate(constant)
+            ))
+        return '\n'.join(lines)
+
+
+def profile(program: Program, registers: Registers = None, limit: int = 10 ** 6,
+            every: int = 1000, keep: int = 5) -> Profile:
+    """Run a program one instruction at a time, recording what it does.
+
+    Parameters
+    ----------
+    program
+        The program to run.
+    registers : optional
+        The starting registers, all zero by default. They are updated in place.
+    limit : optional
+        Stop after this many steps, for programs that would run for too long.
+    every : optional
+        Sample the registers on every ``every``-th run of an instruction...
+    keep : optional
+        ...keeping the first ``keep`` samples of each.
+    """
+    pointer, instructions = program
+    decoded = decode(instructions)
+    registers = [0] * 6 if registers is None else registers
+    counts = [0] * len(decoded)
+    edges = collections.Counter()
+    samples = collections.defaultdict(list)
+    steps = 0
+    ip = registers[pointer]
+    while 0 <= ip < len(decoded) and steps < limit:
+        registers[pointer] = ip
+        operation, a, b, c = decoded[ip]
+        operation(registers, a, b, c)
+        count = counts[ip] = counts[ip] + 1
+        if (count - 1) % every == 0 and len(samples[ip]) < keep:
+            samples[ip].append(tuple(registers))
+        following = registers[pointer] + 1
+        if following != ip + 1:
+            edges[ip, following] += 1
+        ip = following
+        steps += 1
+
+    return Profile(program, counts, edges, dict(samples), steps, not 0 <= ip < len(decoded))
+
+
 def memory_factory(n: int = 6) -> VirtualMemory:
     return VirtualMemory([0 for _ in range(n)])
 
@@ -31,44 +438,26 @@ class IPController:
 
     @staticmethod
     def solve(n: int) -> int:
-        """These are the rules that are applied to r0 step-by-step. We're just fast-forwarding."""
-        answer = 0
-        for i in range(1, n + 1):
-            if i ** 2 == n:
-                answer += 1
-            elif n % i == 0:
-                answer += i
-        return answer
+        """The sum of the divisors of ``n``, which is what the program leaves in r0."""
+        return divisor_sum(n)
 
     def run(self) -> int:
-        pointer, instructions = self.program
-        instruction = instructions[self.memory[pointer]]
-        in_scope = True
-        canary = self.memory[5]
-        counter = collections.Counter()
-        start = self.memory[0]
-        while in_scope:
-            try:
-                # Try to short-circuit the loop. r1 is a comparison value
-                # if initial r0 == 0, the first time r1 + *previous* r5 == *current* r5, we're done
-                # else, allow that value to repeat a couple since the above *always* happens once
-                # Note: The canary index and target index change depending on the index assigned to IP
-                # I don't currently have a method to detect this automatically
-                if canary and self.memory[1] + canary == self.memory[5]:
-                    if (start and counter[canary] > 2) or start == 0:
-                        break
-                    counter[canary] += 1
-                # Set the new canary value
-                canary = self.memory[5]
-                getattr(self.memory, instruction.opcode)(instruction.a, instruction.b, instruction.c)
-                self.memory[pointer] += 1
-                instruction = instructions[self.memory[pointer]]
-            # Ideally we've short-circuited the loop before we get an index error.
-            except IndexError:
-                in_scope = False
-                log.info("Your optimization didn't work, dummy.")
-
-        return self.solve(self.memory[5])
+        """Run the program with any divisor-sum loops replaced, and return r0.
+
+        Programs without the idiom simply run on the compiled code.
+        """
+        pointer, _ = self.program
+        loops = {x.start: x for x in find_divisor_sums(self.program)}
+        if not loops:
+            log.info("No divisor-sum loop found, running the whole program.")
+        compiled = compile_program(self.program, len(self.memory.registers), loops)
+        compiled(self.memory.registers, lambda registers, index: loops[index](registers, pointer))
+        return self.memory[0]
+
+    def execute(self) -> int:
+        """Run the whole program, without any short-circuiting, and return r0."""
+        compile_program(self.program, len(self.memory.registers))(self.memory.registers)
+        return self.memory[0]
 
 
 def get_program(path: pathlib.Path = INPUT) -> Program:
@@ -3,9 +3,10 @@
 import collections
 import enum
 import pathlib
+from typing import Dict, Iterator, List, Optional, Set, TextIO, Tuple, Union
 
 from dec20 import INPUT
-from util.containers import CardinalDirections, Point
+from util.containers import Grid
 
 
 class OrFlags(enum.Enum):
@@ -14,38 +15,136 @@ class OrFlags(enum.Enum):
     FINISH = ')'
 
 
+# Rooms are encoded as integers; the origin sits in the middle so the route can go either way.
+ROOMS = Grid(1 << 24, origin=(1 << 23, 1 << 23))
+
+
 class FloorPlan:
+    """The rooms and doors described by a route regex.
+
+    Rooms are encoded with :data:`ROOMS`. Each door is stored as a single integer,
+    ``2 * room + 0`` for the door east of ``room`` and ``2 * room + 1`` for the one
+    south of it, so the whole map is one set of integers. Shortest distances come
+    from one breadth-first search over the doors and are kept for every query.
+    """
+
+    CHUNK_SIZE = 1 << 16
 
-    def __init__(self, scenario: str):
-        self.rooms = {}
-        self.branches = collections.deque()
+    def __init__(self, scenario: Union[str, TextIO]):
+        self.origin = ROOMS.encode(0, 0)
+        self.doors: Set[int] = set()
+        self._distances: Optional[Dict[int, int]] = None
         self.map(scenario)
 
-    def map(self, scenario: str):
-        position = Point(0, 0)
-        doors = 0
-        for flag in scenario.strip('^$'):
-            if flag == OrFlags.START.value:
-                self.branches.append((position, doors))
-            elif flag == OrFlags.FINISH.value:
-                position, doors = self.branches.pop()
-            elif flag == OrFlags.OR.value:
-                position, doors = self.branches[-1]
-            else:
-                position += CardinalDirections.get(flag)
-                doors += 1
-                if position in self.rooms:
-                    self.rooms[position] = min(self.rooms[position], doors)
-                else:
-                    self.rooms[position] = doors
+    @classmethod
+    def from_file(cls, path: pathlib.Path) -> 'FloorPlan':
+        with path.open() as file:
+            return cls(file)
+
+    @staticmethod
+    def door(room: int, other: int) -> int:
+        """The door between two neighboring rooms."""
+        if other < room:
+            room, other = other, room
+        return 2 * room + (other - room != 1)
+
+    def _chunks(self, scenario: Union[str, TextIO]) -> Iterator[str]:
+        if isinstance(scenario, str):
+            yield scenario
+            return
+        chunk = scenario.read(self.CHUNK_SIZE)
+        while chunk:
+            yield chunk
+            chunk = scenario.read(self.CHUNK_SIZE)
+
+    def map(self, scenario: Union[str, TextIO]):
+        """Add the doors along a route regex, read a chunk at a time from a string or file.
+
+        Rather than a frame per branch, every open group keeps the set of rooms
+        its alternatives start from and the set they have ended in so far. The
+        route is followed from all current rooms at once, so branches that meet
+        again are only walked once and memory is bounded by the number of rooms.
+        """
+        positions = {self.origin}
+        groups: List[Tuple[Set[int], Set[int]]] = []
+        moves = ROOMS.moves
+        door = self.door
+        doors = self.doors
+        for chunk in self._chunks(scenario):
+            for flag in chunk:
+                step = moves.get(flag)
+                if step is not None:
+                    if len(positions) == 1:
+                        position, = positions
+                        following = position + step
+                        doors.add(door(position, following))
+                        positions = {following}
+                    else:
+                        doors.update(door(x, x + step) for x in positions)
+                        positions = {x + step for x in positions}
+                elif flag == OrFlags.START.value:
+                    groups.append((positions, set()))
+                elif flag == OrFlags.OR.value:
+                    if not groups:
+                        raise ValueError(f"The route has a '{flag}' outside of any group.")
+                    starts, ends = groups[-1]
+                    ends |= positions
+                    positions = starts
+                elif flag == OrFlags.FINISH.value:
+                    if not groups:
+                        raise ValueError("The route closes a group that was never opened.")
+                    _, ends = groups.pop()
+                    positions = ends | positions
+        if groups:
+            raise ValueError(f"The route ends with {len(groups)} unclosed group(s).")
+        self._distances = None
+
+    def neighbors(self, room: int) -> List[int]:
+        """The rooms one door away."""
+        doors = self.doors
+        width = ROOMS.width
+        return [
+            other for other, key in (
+                (room + 1, 2 * room), (room - 1, 2 * room - 2),
+                (room + width, 2 * room + 1), (room - width, 2 * (room - width) + 1),
+            ) if key in doors
+        ]
+
+    @property
+    def distances(self) -> Dict[int, int]:
+        """The fewest doors to pass through to reach every room from the origin."""
+        if self._distances is None:
+            distances = {self.origin: 0}
+            queue = collections.deque([self.origin])
+            while queue:
+                room = queue.popleft()
+                distance = distances[room] + 1
+                for other in self.neighbors(room):
+                    if other not in distances:
+                        distances[other] = distance
+                        queue.append(other)
+            self._distances = distances
+        return self._distances
+
+    @property
+    def rooms(self) -> Dict[int, int]:
+        """Every room other than the origin, with its distance."""
+        return {k: v for k, v in self.distances.items() if k != self.origin}
+
+    def furthest(self) -> int:
+        """The most doors on the shortest path to any room."""
+        return max(self.distances.values())
+
+    def count_at_least(self, doors: int) -> int:
+        """How many rooms are at least ``doors`` doors away."""
+        return sum(x >= doors for x in self.distances.values())
 
 
 def get_answer1(path: pathlib.Path = INPUT):
-    floor = FloorPlan(path.read_text().strip())
-    return max(floor.rooms.values())
+    floor = FloorPlan.from_file(path)
+    return floor.furthest()
 
 
 def get_answer2(path: pathlib.Path = INPUT):
-    floor = FloorPlan(path.read_text().strip())
-    return sum(x >= 1000 for x in floor.rooms.values())
-
+    floor = FloorPlan.from_file(path)
+    return floor.count_at_least(1000)
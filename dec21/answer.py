@@ -2,91 +2,114 @@
 # -*- coding: UTF-8 -*-
 import dataclasses
 import pathlib
-from typing import Set, Tuple
+from typing import Callable, Iterator, List, Tuple, TypeVar
 
 from dec21 import INPUT
-from dec19.answer import get_program
+from dec19.answer import Instruction, compile_program, find_divisions, get_program
+
+T = TypeVar('T')
+
+
+def find_cycle(sequence: Callable[[], Iterator[T]]) -> Tuple[int, int, T]:
+    """Brent's cycle detection over a sequence that can be restarted.
+
+    Returns ``(mu, lam, last)``: the index where the cycle starts, its length and
+    the last value before the first repeat. Only a few values are held at a time.
+    """
+    # Find the length of the cycle with a tortoise that teleports to the hare.
+    values = sequence()
+    power = lam = 1
+    tortoise = next(values)
+    hare = next(values)
+    while tortoise != hare:
+        if power == lam:
+            tortoise = hare
+            power *= 2
+            lam = 0
+        hare = next(values)
+        lam += 1
+
+    # Then walk two copies of the sequence, ``lam`` values apart, until they meet.
+    tortoises, hares = sequence(), sequence()
+    for _ in range(lam):
+        hare = next(hares)
+    mu = 0
+    tortoise, last, hare = next(tortoises), hare, next(hares)
+    while tortoise != hare:
+        tortoise, last, hare = next(tortoises), hare, next(hares)
+        mu += 1
+    return mu, lam, last
 
 
 @dataclasses.dataclass
 class Program:
-    borval: int = 0
-    setval: int = 0
-    banval1: int = 0
-    banval2: int = 0
-    mulval: int = 0
-    gtval: int = 0
+    """An activation program which halts once r0 matches the value it's compared to."""
+    pointer: int = 0
+    instructions: List[Instruction] = dataclasses.field(default_factory=list)
 
     def load(self, path: pathlib.Path):
-        """Load the low-level instructions and extract the important values/operations.
+        self.pointer, self.instructions = get_program(path)
+
+    @property
+    def program(self):
+        return self.pointer, self.instructions
 
-        This should work with all inputs, but I only have one to test with.
+    def halting_check(self) -> Tuple[int, int]:
+        """Find the one comparison against r0, as ``(index, compared register)``."""
+        checks = [
+            (i, x.b if x.a == 0 else x.a) for i, x in enumerate(self.instructions)
+            if x.opcode == 'eqrr' and 0 in (x.a, x.b)
+        ]
+        if len(checks) != 1:
+            raise ValueError(f"Expected one comparison against r0, found {len(checks)}.")
+        return checks[0]
+
+    def exit_values(self) -> Iterator[int]:
+        """Every value that r0 would have to hold to halt the program, in order.
+
+        The program runs compiled, with its division loops short-circuited, and
+        pauses at the halting check to hand out the value it's about to compare.
         """
-        important_ops = {'bori', 'seti', 'bani', 'muli', 'gtir'}
-        ip, instructions = get_program(path)
-        instructions = [x for x in instructions if x.opcode in important_ops]
-        for instruction in instructions:
-            if instruction.opcode == 'seti' and instruction.a > self.setval:
-                self.setval = instruction.a
-            elif instruction.opcode == 'bani':
-                if instruction.b < 400:
-                    self.banval1 = instruction.b
-                elif instruction.b > 500:
-                    self.banval2 = instruction.b
-            elif instruction.opcode == 'bori':
-                self.borval = instruction.b
-            elif instruction.opcode == 'muli' and instruction.b > 300:
-                self.mulval = instruction.b
-            elif instruction.opcode == 'gtir':
-                self.gtval = instruction.a
-
-    def run(self) -> Tuple[int, int, Set[int]]:
-        """Run the program defined in the input, but short-circuit it.
-
-        The Program is designed to to loop through the instructions until a certain set of criteria are met.
-        We can identify the target values because they are unique values in the instruction set,
-        then we can perform the operation which takes place one at a time in the loop all at once.
-
-        The answer for part 1 is the first 'exit value' found, the answer to part 2 is the last.
-
-        We know it's the last exit value if the exit values start to repeat."""
-        first = last = op = 0
-        seen = set()
+        index, compared = self.halting_check()
+        divisions = {x.start: x for x in find_divisions(self.program)}
+        compiled = compile_program(self.program, traps={index, *divisions})
+        registers = [0] * 6
+        paused = False
+
+        def trap(registers: List[int], at: int):
+            nonlocal paused
+            if at != index:
+                return divisions[at](registers, self.pointer)
+            # Stop here the first time, and run the check when resumed.
+            paused = not paused
+            return -1 if paused else None
 
         while True:
-            comp = op | self.borval
-            op = self.setval
-
-            while True:
-                # This is the calculation that takes place one-at-a-time in the instructions
-                op = (((op + (comp & self.banval1)) & self.banval2) * self.mulval) & self.banval2
-                # This indicates we've reached an exit value
-                if self.gtval > comp:
-                    # We've started looping back through exit values, break out.
-                    if op in seen:
-                        return first, last, seen
-                    # Track the exit values we've seen
-                    seen.add(op)
-                    # Part 2
-                    last = op
-                    if len(seen) == 1:
-                        # Part 1
-                        first = op
-                    break
-                # Otherwise, we need to keep looping
-                else:
-                    comp = int(comp / self.gtval)
+            compiled(registers, trap)
+            if not paused:
+                return
+            yield registers[compared]
+
+    def run(self) -> Tuple[int, int]:
+        """The first exit value, and the last one before they start to repeat.
+
+        The first halts the program after the fewest instructions; the last after
+        the most, of the values that halt it at all.
+        """
+        first = next(self.exit_values())
+        _, _, last = find_cycle(self.exit_values)
+        return first, last
 
 
 def get_answer1(path: pathlib.Path = INPUT) -> int:
     program = Program()
     program.load(path)
-    first, last, seen = program.run()
+    first, last = program.run()
     return first
 
 
 def get_answer2(path: pathlib.Path = INPUT) -> int:
     program = Program()
     program.load(path)
-    first, last, seen = program.run()
+    first, last = program.run()
     return last
@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+from dec10 import answer
+
+
+def test_plot_negative_coordinates():
+    satellites = [
+        answer.Satellite(answer.Point(x, y), answer.Velocity(0, 0))
+        for x, y in ((-10_000, -10_000), (-9_998, -9_999))
+    ]
+    chart = answer.StarChart(satellites)
+    chart.plot()
+    assert chart.chart.shape == (2, 3)
+    assert chart.draw(na_rep='.') == '#..\n..#'
+    assert chart.draw(delim=',', na_rep='.', index=True) == ',-10000,#,.,.\n,-9999,.,.,#'
+
+
+def test_read_message():
+    chart = answer.StarChart(answer.get_satellites())
+    chart.scan()
+    assert chart.read() == 'RGRKHKNA'
+    assert chart.elapsed == 10117
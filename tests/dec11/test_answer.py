@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+from dec11 import answer
+
+
+def test_get_power():
+    assert answer.FuelGrid(18).get_power(33, 45) == 29
+    assert answer.FuelGrid(42).get_power(21, 61) == 30
+
+
+def test_best_for_size():
+    assert answer.get_answer1(18) == (29, (33, 45), 3)
+    assert answer.get_answer1(42) == (30, (21, 61), 3)
+
+
+def test_best_overall():
+    assert answer.get_answer2(18) == (113, (90, 269), 16)
+    assert answer.get_answer2(42, workers=2) == (119, (232, 251), 12)
+
+
+def test_best_many():
+    assert answer.FuelGrid.best_many([18, 42], [3]) == [answer.get_answer1(18), answer.get_answer1(42)]
+    assert answer.FuelGrid.best_many([18, 42], range(10, 20)) == [
+        (113, (90, 269), 16), (119, (232, 251), 12)
+    ]
+
+
+def test_table_cache():
+    answer.FuelGrid.clear_cache()
+    grid = answer.FuelGrid(18)
+    assert answer.FuelGrid(18).table is grid.table
+    assert not grid.table.flags.writeable
+
+
+def test_large_serial():
+    serial = 10_000_000
+    cells = range(1, 301)
+    expected = [[((x + 10) * y + serial) * (x + 10) // 100 % 10 - 5 for y in cells] for x in cells]
+    assert answer.FuelGrid.power_levels([serial])[0].tolist() == expected
+    assert answer.FuelGrid(serial).get_power(300, 300, 1) == expected[299][299]
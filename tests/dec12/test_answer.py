@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+from itertools import product
+
+from dec12 import EXAMPLE, answer
+
+
+def test_run():
+    machine = answer.StateMachine(*answer.get_state_and_rules(EXAMPLE))
+    power, total, i = machine.run(20)
+    assert total == 325
+    assert min(machine.state) == -2
+    assert max(machine.state) == 34
+
+
+def test_step():
+    machine = answer.StateMachine(*answer.get_state_and_rules(EXAMPLE))
+    machine.step()
+    assert machine.state == {0, 4, 9, 15, 18, 21, 24}
+
+
+def test_cycle_detection():
+    machine = answer.StateMachine(*answer.get_state_and_rules(EXAMPLE))
+    expected = [machine.total_at(g) for g in range(300)]
+    assert machine.cycle is not None
+    assert machine.cycle.period == 1
+    assert machine.total_at(50) < machine.total_at(299)
+
+    simulated = answer.StateMachine(*answer.get_state_and_rules(EXAMPLE))
+    totals = []
+    for _ in range(300):
+        totals.append(simulated.total)
+        simulated._advance()
+    assert totals == expected
+    assert [machine.total_at(g) for g in (10, 5, 299, 7)] == [expected[g] for g in (10, 5, 299, 7)]
+
+    start, period, shift = machine.cycle
+    step = machine.total_at(start + 1) - machine.total_at(start)
+    assert machine.total_at(50000000000) == machine.total_at(start) + step * (50000000000 - start)
+
+
+def test_unstable_pattern():
+    # Rule 90 grows a Sierpinski triangle from a single plant, so it never repeats
+    rules = {''.join(x): '#' if (x[1] == '#') != (x[3] == '#') else '.' for x in product('.#', repeat=5)}
+    machine = answer.StateMachine({0}, rules)
+    totals = [machine.total_at(g) for g in range(200)]
+    assert machine.cycle is None
+    assert len(machine.seen) == 200
+    assert all(len(x) == 16 for x in machine.seen)
+    assert [machine.total_at(g) for g in (150, 3, 199, 64)] == [totals[g] for g in (150, 3, 199, 64)]
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+import pytest
+
+from dec13 import EXAMPLE, EXAMPLE2, INPUT, answer
+
+
+def test_first_collision():
+    controller = answer.CartsController(EXAMPLE.read_text().splitlines())
+    while not controller.collisions:
+        controller.step()
+    assert controller.first_collision[0] == (7, 3)
+    assert controller.loops == 14
+
+
+def test_final_cart():
+    controller = answer.CartsController(EXAMPLE2.read_text().splitlines())
+    controller.run()
+    assert controller.final_cart.position == (6, 4)
+
+
+def test_run_real():
+    controller = answer.CartsController(INPUT.read_text().splitlines())
+    controller.run()
+    assert controller.first_collision[0] == (40, 90)
+    assert controller.final_cart.position == (65, 81)
+
+
+def test_snapshot_restore():
+    controller = answer.CartsController(INPUT.read_text().splitlines())
+    controller.advance(500)
+    restored = answer.CartsController.restore(controller.snapshot())
+    assert restored.loops == 500
+    assert restored.collisions == controller.collisions
+    controller.run()
+    restored.run()
+    assert restored.loops == controller.loops
+    assert restored.final_cart.position == controller.final_cart.position
+
+
+def test_on_tick():
+    stats = []
+    controller = answer.CartsController(EXAMPLE2.read_text().splitlines(), on_tick=stats.append)
+    controller.run()
+    assert [x.tick for x in stats] == list(range(1, controller.loops + 1))
+    assert stats[-1].alive == 1
+    assert sum(x.collisions for x in stats) == 4
+
+
+@pytest.mark.parametrize('chart', [
+    ['^ ^', '| |'],
+    ['| |', 'v v'],
+    ['<-', '<-'],
+    ['->', '->'],
+])
+def test_derail_off_the_chart(chart):
+    controller = answer.CartsController(chart)
+    with pytest.raises(answer.DerailedError):
+        controller.advance(1)
+
+
+def test_cart_step_off_the_chart():
+    track = answer.Track(['^', '|'])
+    cart = answer.Cart(answer.Point(0, 0), answer.UP)
+    with pytest.raises(answer.DerailedError):
+        cart.step(track)
+
+
+def test_encoding():
+    track = answer.Track(['/-\\', '\\-/'])
+    assert track.encode(answer.Point(0, 0)) == track.width
+    assert track.decode(track.encode(answer.Point(2, 1))) == (2, 1)
+    assert len(track.cells) == track.width * (track.height + 2)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+from dec14 import answer
+
+
+def test_iterate():
+    assert answer.ScoreBoard().iterate(9) == [5, 1, 5, 8, 9, 1, 6, 7, 7, 9]
+    assert answer.ScoreBoard().iterate(5) == [0, 1, 2, 4, 5, 1, 5, 8, 9, 1]
+    assert answer.ScoreBoard().iterate(2018) == [5, 9, 4, 1, 4, 2, 9, 8, 8, 2]
+
+
+def test_num_scores():
+    assert answer.ScoreBoard().num_scores(51589) == 9
+    assert answer.ScoreBoard().num_scores(92510) == 18
+    assert answer.ScoreBoard().num_scores(59414) == 2018
+
+
+def test_stream_matcher():
+    buffer = bytearray(b'\x01\x02')
+    matcher = answer.StreamMatcher(b'\x02\x03\x04')
+    assert matcher.scan(buffer) is None
+    buffer += b'\x03'
+    assert matcher.scan(buffer) is None
+    buffer += b'\x04\x02\x03\x04'
+    assert matcher.scan(buffer) == 1
+
+
+def test_targets():
+    assert answer.ScoreBoard(target='01245').num_scores() == 5
+    assert answer.ScoreBoard().num_scores([0, 1, 2, 4, 5]) == 5
+    assert answer.ScoreBoard(target=9).iterate() == [5, 1, 5, 8, 9, 1, 6, 7, 7, 9]
+
+
+def test_lazy_target():
+    answer.INPUTS.clear()
+    board = answer.ScoreBoard()
+    assert not answer.INPUTS.is_cached('dec14')
+    assert board.target == answer.get_digits(answer.INPUT.read_text())
+    assert answer.INPUTS.is_cached('dec14')
+    assert answer.INPUTS.is_cached(answer.INPUT)
+
+
+def test_registry_membership():
+    answer.INPUTS.clear()
+    assert 'dec14' in answer.INPUTS
+    assert 'dec18' not in answer.INPUTS and 14 not in answer.INPUTS
+    assert not answer.INPUTS.is_cached('dec14')
+    assert answer.INPUTS.days is answer.INPUTS.days
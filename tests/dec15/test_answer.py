@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+import io
+
+import pytest
+
+from dec15 import EXAMPLE, answer
+
+BATTLES = [
+    ("""#######
+#.G...#
+#...EG#
+#.#.#G#
+#..G#E#
+#.....#
+#######""", 27730, 4988),
+    ("""#######
+#E..EG#
+#.#G.E#
+#E.##E#
+#G..#.#
+#..E#.#
+#######""", 39514, 31284),
+    ("""#######
+#E.G#.#
+#.#G..#
+#G.#.G#
+#G..#.#
+#...E.#
+#######""", 27755, 3478),
+    ("""#######
+#.E...#
+#.#..G#
+#.###.#
+#E#G#G#
+#...#G#
+#######""", 28944, 6474),
+]
+
+
+@pytest.mark.parametrize('battle, outcome, _', BATTLES)
+def test_outcome(battle, outcome, _):
+    rounds, hp = answer.TableTopGame(battle.splitlines()).run()
+    assert rounds * hp == outcome
+
+
+@pytest.mark.parametrize('battle, _, outcome', BATTLES)
+def test_elf_outcome(tmp_path, battle, _, outcome):
+    path = tmp_path / 'input.txt'
+    path.write_text(battle)
+    assert answer.get_answer2(path) == outcome
+
+
+def test_example():
+    assert answer.get_answer1(EXAMPLE) == 18740
+    assert answer.get_answer2(EXAMPLE) == 1140
+
+
+def test_get_move():
+    game = answer.TableTopGame(['#######', '#E..G.#', '#...#.#', '#.G.#G#', '#######'])
+    assert game.get_move(game.units[0]) == (1, 2)
+    game = answer.TableTopGame(['#######', '#.E...#', '#.....#', '#...G.#', '#######'])
+    assert game.get_move(game.units[0]) == (1, 3)
+
+
+def test_sweep_elf_attack():
+    game = answer.TableTopGame(BATTLES[0][0].splitlines())
+    assert answer.sweep_elf_attack(game) == (15, 4988)
+    assert answer.sweep_elf_attack(game, workers=2) == (15, 4988)
+    assert answer.fight(game, 14) is None
+    assert game.rounds == 0
+    example = answer.TableTopGame(EXAMPLE.read_text().splitlines())
+    assert answer.sweep_elf_attack(example, workers=3) == (34, 1140)
+
+
+def test_combat_log():
+    log = io.StringIO()
+    profiles = []
+    game = answer.TableTopGame(
+        BATTLES[0][0].splitlines(), on_event=answer.CombatLog(log), on_round=profiles.append
+    )
+    rounds, hp = game.run()
+    log.seek(0)
+    events = list(answer.CombatLog.read(log))
+    deaths = [x for x in events if x.kind == 'death']
+    assert {x.team for x in deaths} == {'E'}
+    assert len(deaths) == 2
+    assert max(x.round for x in events) == rounds
+    assert [x.round for x in profiles] == list(range(1, rounds + 2))
+    assert [x.complete for x in profiles] == [True] * rounds + [False]
+    assert profiles[0].nodes
+    # Hooks aren't carried into copies
+    game = answer.TableTopGame(
+        BATTLES[0][0].splitlines(), on_event=answer.CombatLog(log), on_round=profiles.append
+    )
+    assert answer.fight(game, 15) == 4988
+
+
+def test_profile_counts_searches(monkeypatch):
+    profiles = []
+    game = answer.TableTopGame(['#######', '#E.G..#', '#E....#', '#######'], on_round=profiles.append)
+    next(x for x in game.units if x.team == 'G').hp = 1
+    plans = []
+    plan = game.plan
+    monkeypatch.setattr(game, 'plan', lambda *args: plans.append(args) or plan(*args))
+    game.step()
+    # The second elf finds no enemies left, so it never searches
+    assert len(plans) == 1
+    assert len(profiles[0].nodes) == len(plans)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+import pytest
+
+from dec16 import answer, EXAMPLE
+
+
+def test_candidates():
+    examples = answer.load_examples(EXAMPLE)
+    assert examples[0].candidates == {'mulr', 'addi', 'seti'}
+
+
+def test_operations_match_memory():
+    for name, operation in answer.OPERATIONS.items():
+        registers = [3, 2, 1, 1]
+        memory = answer.VirtualMemory(registers[:])
+        getattr(memory, name)(2, 1, 2)
+        operation(registers, 2, 1, 2)
+        assert registers == memory.registers, name
+
+
+def test_decode():
+    instructions = [answer.Instruction(9, 2, 1, 2), answer.Instruction(3, 2, 0, 0)]
+    decoded = answer.decode(instructions, {9: 'mulr', 3: 'setr'})
+    assert decoded == [(answer.mulr, 2, 1, 2), (answer.setr, 2, 0, 0)]
+    registers = [3, 2, 1, 1]
+    for operation, a, b, c in decoded:
+        operation(registers, a, b, c)
+    assert registers == [2, 2, 2, 1]
+
+
+def test_candidate_masks():
+    opcodes, masks = answer.candidate_masks(answer.load_examples(EXAMPLE))
+    assert opcodes.tolist() == [9]
+    names = {name for bit, name in enumerate(answer.OPERATION_NAMES) if int(masks[0]) >> bit & 1}
+    assert names == {'mulr', 'addi', 'seti'}
+    assert answer.count_bits(masks).tolist() == [3]
+
+
+def test_resolve_opcodes():
+    examples = [
+        answer.InstructionSet((3, 2, 1, 1), answer.Instruction(9, 2, 1, 2), (3, 2, 2, 1)),
+        answer.InstructionSet((3, 2, 1, 1), answer.Instruction(9, 2, 1, 2), (3, 2, 2, 1)),
+    ]
+    with pytest.raises(answer.AmbiguousOpcodesError) as error:
+        answer.resolve_opcodes(examples)
+    assert error.value.candidates == {9: {'mulr', 'addi', 'seti'}}
+    # 9 0 1 2 sets r2 to r0 * r1 = 1, which rules out both addi and seti
+    examples.append(answer.InstructionSet((1, 1, 0, 0), answer.Instruction(9, 0, 1, 2), (1, 1, 1, 0)))
+    assert answer.resolve_opcodes(examples) == {9: 'mulr'}
+
+
+def test_resolve_opcodes_conflict():
+    examples = [
+        answer.InstructionSet((0, 0, 0, 0), answer.Instruction(1, 5, 0, 0), (5, 0, 0, 0)),
+        answer.InstructionSet((0, 0, 0, 0), answer.Instruction(2, 5, 0, 0), (5, 0, 0, 0)),
+    ]
+    with pytest.raises(answer.AmbiguousOpcodesError):
+        answer.resolve_opcodes(examples)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+from dec17 import answer, EXAMPLE
+from util.containers import OrderedSet
+
+
+def test_vector_contains():
+    vector = answer.Vector(OrderedSet([495]), OrderedSet(range(2, 8)))
+    assert (495, 3) in vector
+    assert (495, 8) not in vector
+    assert 495 in vector
+    assert answer.Vector(OrderedSet(range(490, 500)), OrderedSet([3])) in vector
+    assert answer.Vector(OrderedSet(range(490, 500)), OrderedSet([9])) not in vector
+
+
+def test_grid():
+    vector_map = answer.VectorMap(answer.load_vectors(EXAMPLE))
+    assert (vector_map.offset, vector_map.grid.shape) == (494, (14, 14))
+    assert vector_map[495, 2] == answer.CLAY
+    assert vector_map[496, 2] == answer.SAND
+    assert vector_map.count(answer.CLAY) == 34
+    assert len(vector_map.available_area) == 12 * 13 - 34
+
+
+def test_flow():
+    vector_map = answer.VectorMap(answer.load_vectors(EXAMPLE)).flow()
+    assert vector_map.draw().splitlines()[9:] == [
+        '...|||||||||..',
+        '...|#~~~~~#|..',
+        '...|#~~~~~#|..',
+        '...|#~~~~~#|..',
+        '...|#######|..',
+    ]
+    assert vector_map.count(answer.FLOWING, answer.STILL) == 57
+    assert vector_map.count(answer.STILL) == 29
+
+
+def test_merging_streams():
+    # Two streams fall into the same basin; the one that lands on the other
+    # has to rise with it once the basin fills.
+    vectors = [
+        answer.Vector(OrderedSet(range(497, 504)), OrderedSet([3])),
+        answer.Vector(OrderedSet([494]), OrderedSet(range(6, 11))),
+        answer.Vector(OrderedSet([506]), OrderedSet(range(6, 11))),
+        answer.Vector(OrderedSet(range(494, 507)), OrderedSet([11])),
+    ]
+    vector_map = answer.VectorMap(vectors).flow()
+    assert vector_map.count(answer.STILL) == 11 * 5
+    assert all(vector_map[x, 5] == answer.FLOWING for x in range(493, 508))
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+from dec16.answer import seti, decode
+from dec19 import answer, EXAMPLE, INPUT
+
+# The divisor-sum idiom with other registers than the input and some operands swapped
+DIVISORS = (5, [answer.Instruction(*x) for x in (
+    ('seti', 16, 0, 5),
+    ('seti', 1, 0, 2),
+    ('seti', 1, 0, 1),
+    ('mulr', 1, 2, 3),
+    ('eqrr', 4, 3, 3),
+    ('addr', 5, 3, 5),
+    ('addi', 5, 1, 5),
+    ('addr', 0, 2, 0),
+    ('addi', 1, 1, 1),
+    ('gtrr', 1, 4, 3),
+    ('addr', 5, 3, 5),
+    ('seti', 2, 0, 5),
+    ('addi', 2, 1, 2),
+    ('gtrr', 2, 4, 3),
+    ('addr', 3, 5, 5),
+    ('seti', 1, 0, 5),
+    ('mulr', 5, 5, 5),
+    ('seti', 12, 0, 4),
+    ('seti', 0, 0, 5),
+)])
+
+
+def test_get_program():
+    pointer, instructions = answer.get_program(EXAMPLE)
+    assert pointer == 0
+    assert instructions[0] == ('seti', 5, 0, 1)
+    assert decode(instructions)[0] == (seti, 5, 0, 1)
+
+
+def test_run():
+    controller = answer.IPController(answer.get_program(EXAMPLE))
+    controller.run()
+    assert controller.memory.registers == [6, 5, 6, 0, 0, 9]
+
+
+def test_solve():
+    assert answer.IPController.solve(10) == 18
+
+
+def test_execute():
+    controller = answer.IPController(answer.get_program(EXAMPLE))
+    assert controller.execute() == 6
+    assert controller.memory.registers == [6, 5, 6, 0, 0, 9]
+
+
+def test_compile_program():
+    program = answer.get_program(EXAMPLE)
+    assert answer.compile_program(program) is answer.compile_program(answer.get_program(EXAMPLE))
+    # Without an ip register the program is a single straight-line block
+    straight = (None, [answer.Instruction('seti', 7, 0, 1), answer.Instruction('mulr', 1, 1, 2)])
+    registers = [0, 0, 0, 0]
+    answer.compile_program(straight, 4)(registers)
+    assert registers == [0, 7, 49, 0]
+
+
+def test_compile_dynamic_jump():
+    # r1 = 1; jump over the next instruction by adding r1 to the ip; r2 is never set to 5
+    program = (0, [
+        answer.Instruction('seti', 1, 0, 1),
+        answer.Instruction('addr', 1, 0, 0),
+        answer.Instruction('seti', 5, 0, 2),
+        answer.Instruction('addi', 2, 3, 3),
+    ])
+    registers = [0] * 6
+    answer.compile_program(program)(registers)
+    assert registers == [3, 1, 0, 3, 0, 0]
+
+
+def test_divisor_sum():
+    assert [answer.divisor_sum(n) for n in (0, 1, 9, 10, 12, 16)] == [0, 1, 13, 18, 28, 31]
+    assert answer.IPController.solve(9) == 13
+
+
+def test_find_divisor_sums():
+    assert answer.find_divisor_sums(answer.get_program(INPUT)) == [answer.DivisorSum(1, 3, 2, 1, 5, 0)]
+    assert answer.find_divisor_sums(answer.get_program(EXAMPLE)) == []
+
+
+def test_run_matches_execute():
+    program = DIVISORS
+    assert answer.find_divisor_sums(program) == [answer.DivisorSum(1, 2, 1, 3, 4, 0)]
+
+    fast = answer.IPController(program)
+    slow = answer.IPController(program)
+    assert fast.run() == slow.execute() == 28
+    assert fast.memory.registers == slow.memory.registers
+
+
+def test_traps():
+    calls = []
+
+    def trap(registers, index):
+        calls.append((index, registers[:]))
+
+    registers = [0] * 6
+    answer.compile_program(answer.get_program(EXAMPLE), traps={4})(registers, trap)
+    assert registers == [6, 5, 6, 0, 0, 9]
+    assert calls == [(4, [4, 5, 6, 0, 0, 0])]
+
+
+def test_profile():
+    profile = answer.profile(answer.get_program(EXAMPLE))
+    assert profile.halted
+    assert profile.steps == 5
+    assert profile.counts == [1, 1, 1, 0, 1, 0, 1]
+    assert not profile.back_edges
+    assert profile.loops == []
+
+
+def test_profile_loops():
+    profile = answer.profile(DIVISORS, every=10)
+    assert profile.halted
+    assert profile.back_edges == {(11, 3): 132, (15, 2): 11, (18, 1): 1}
+    assert [x[:2] for x in profile.loops] == [(1, 18), (2, 15), (3, 11)]
+    assert [x.depth for x in profile.loops] == [0, 1, 2]
+    assert profile.hot(1) == [3]
+    assert len(profile.samples[3]) == 5
+    assert all(x[4] == 12 for x in profile.samples[3])
+    report = profile.report()
+    assert '3..11: 132 iterations' in report
+    assert 'r4*=12/12/12/12/12' in report
+
+
+def test_profile_limit():
+    profile = answer.profile(DIVISORS, limit=100)
+    assert not profile.halted
+    assert profile.steps == sum(profile.counts) == 100
+
+
+def test_profile_every_run():
+    profile = answer.profile(answer.get_program(EXAMPLE), every=1)
+    assert sorted(profile.samples) == [0, 1, 2, 4, 6]
+    assert all(len(x) == 1 for x in profile.samples.values())
+    profile = answer.profile(DIVISORS, every=1, keep=3)
+    assert len(profile.samples[3]) == 3
+
+
+def test_division():
+    # r1 = 1000; r2 = r1 // 7 by counting up, with r4 as the ip
+    program = (4, [answer.Instruction(*x) for x in (
+        ('seti', 1000, 0, 1),
+        ('seti', 0, 0, 2),
+        ('addi', 2, 1, 3),
+        ('muli', 3, 7, 3),
+        ('gtrr', 3, 1, 3),
+        ('addr', 3, 4, 4),
+        ('addi', 4, 1, 4),
+        ('seti', 9, 0, 4),
+        ('addi', 2, 1, 2),
+        ('seti', 1, 0, 4),
+    )])
+    divisions = answer.find_divisions(program)
+    assert divisions == [answer.Division(1, 2, 3, 1, 7)]
+
+    registers = [0] * 6
+    answer.compile_program(program, traps=[1])(registers, lambda r, i: divisions[0](r, 4))
+    slow = answer.IPController(program)
+    slow.execute()
+    assert registers == slow.memory.registers
+    assert registers[2] == 1000 // 7
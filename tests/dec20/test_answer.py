@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+import io
+
+import pytest
+
+from dec20 import answer, EXAMPLE
+
+
+@pytest.mark.parametrize('scenario,doors', [
+    ('^WNE$', 3),
+    ('^ENWWW(NEEE|SSE(EE|N))$', 10),
+    ('^ENNWSWW(NEWS|)SSSEEN(WNSE|)EE(SWEN|)NNN$', 18),
+    ('^ESSWWN(E|NNENN(EESS(WNSE|)SSS|WWWSSSSE(SW|NNNE)))$', 23),
+    ('^WSSEESWWWNW(S|NENNEEEENN(ESSSSW(NWSW|SSEN)|WSWWN(E|WWS(E|SS))))$', 31),
+])
+def test_furthest(scenario, doors):
+    assert answer.FloorPlan(scenario).furthest() == doors
+
+
+def test_loop_back():
+    # Walking round a square reaches the last room through the first door
+    floor = answer.FloorPlan('^NESW$')
+    assert floor.furthest() == 2
+    assert sorted(floor.rooms.values()) == [1, 1, 2]
+    assert len(floor.doors) == 4
+
+
+def test_doors():
+    floor = answer.FloorPlan('^N(E|W)$')
+    north = answer.ROOMS.encode(0, -1)
+    assert sorted(floor.neighbors(north)) == sorted([
+        floor.origin, answer.ROOMS.encode(1, -1), answer.ROOMS.encode(-1, -1)
+    ])
+    assert floor.neighbors(floor.origin) == [north]
+
+
+def test_count_at_least():
+    floor = answer.FloorPlan(EXAMPLE.read_text().strip())
+    assert floor.furthest() == 23
+    assert floor.count_at_least(0) == len(floor.distances)
+    assert [floor.count_at_least(x) for x in (22, 23, 24)] == [2, 1, 0]
+
+
+def test_streaming(monkeypatch):
+    scenario = EXAMPLE.read_text()
+    monkeypatch.setattr(answer.FloorPlan, 'CHUNK_SIZE', 3)
+    floor = answer.FloorPlan(io.StringIO(scenario))
+    assert floor.doors == answer.FloorPlan(scenario.strip()).doors
+    assert answer.FloorPlan.from_file(EXAMPLE).furthest() == 23
+
+
+def test_fan_out():
+    # Every group doubles the paths, but they keep landing on the same rooms
+    floor = answer.FloorPlan('^' + '(N|E)' * 200 + '$')
+    assert floor.furthest() == 200
+    assert len(floor.distances) == 201 * 202 // 2
+
+
+def test_unclosed_group():
+    with pytest.raises(ValueError):
+        answer.FloorPlan('^N(E|W$')
+
+
+@pytest.mark.parametrize('route', ['^NE)W$', '^N(E|W))$', '^N|E$'])
+def test_unopened_group(route):
+    with pytest.raises(ValueError):
+        answer.FloorPlan(route)
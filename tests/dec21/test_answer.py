@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+import itertools
+
+import pytest
+
+from dec19.answer import IPController
+from dec21 import answer, INPUT
+
+
+def test_find_cycle():
+    def sequence():
+        # 3, 10, 5, 16, 8, 4, 2, 1, 4, 2, 1, ...
+        value = 3
+        while True:
+            yield value
+            value = value // 2 if value % 2 == 0 else 3 * value + 1
+
+    assert answer.find_cycle(sequence) == (5, 3, 1)
+    assert answer.find_cycle(lambda: itertools.cycle([7])) == (0, 1, 7)
+
+
+def test_halting_check():
+    program = answer.Program()
+    program.load(INPUT)
+    assert program.halting_check() == (28, 1)
+    program.instructions = [x for x in program.instructions if x.opcode != 'eqrr']
+    with pytest.raises(ValueError):
+        program.halting_check()
+
+
+def test_exit_values():
+    program = answer.Program()
+    program.load(INPUT)
+    first, second = itertools.islice(program.exit_values(), 2)
+    assert first == program.run()[0]
+
+    # Both halt the unmodified program when they're put in r0
+    for value in (first, second):
+        controller = IPController(program.program)
+        controller.memory[0] = value
+        assert controller.execute() == value
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from util.containers import CardinalDirections, Grid, OrderedSet, Point
+
+
+def test_order_and_membership():
+    items = OrderedSet([3, 1, 3, 2])
+    assert list(items) == [3, 1, 2]
+    assert 1 in items and 4 not in items
+    items.append(1)
+    items.extend([5, 3])
+    assert items.data == [3, 1, 2, 5]
+    assert items[0] == 3 and items[-1] == 5
+    assert items[1:3] == OrderedSet([1, 2])
+    assert OrderedSet() == []
+    assert list(OrderedSet(np.array([2, 1]))) == [2, 1]
+
+
+def test_indexing_follows_changes():
+    items = OrderedSet('abc')
+    assert items[-1] == 'c'
+    for change, expected in [
+        (lambda: items.add('d'), 'abcd'), (lambda: items.discard('a'), 'bcd'),
+        (lambda: items.pop(1), 'bd'), (lambda: items.__ixor__('bx'), 'dx'),
+        (lambda: items.__iand__('x'), 'x'), (lambda: items.clear(), ''),
+    ]:
+        change()
+        assert [items[i] for i in range(len(items))] == list(expected)
+        assert list(reversed(items)) == list(reversed(expected))
+
+
+def test_remove():
+    items = OrderedSet('abc')
+    items.discard('x')
+    items.remove('b')
+    assert list(items) == ['a', 'c']
+    with pytest.raises(ValueError):
+        items.remove('b')
+    assert items.pop() == 'c'
+    assert items.pop(0) == 'a'
+    with pytest.raises(IndexError):
+        items.pop()
+
+
+def test_operators():
+    assert list(OrderedSet('abc') & 'cba') == ['a', 'b', 'c']
+    assert list(OrderedSet('abc') - 'b') == ['a', 'c']
+    assert list(OrderedSet('abc') | 'dc') == ['a', 'b', 'c', 'd']
+    assert list(OrderedSet('abc') ^ 'bcd') == ['a', 'd']
+    assert OrderedSet('ab') < 'abc' and OrderedSet('abc') >= {'a', 'b'}
+    assert OrderedSet('ab') == ['b', 'a']
+
+
+@pytest.mark.parametrize('operator', ['__iadd__', '__iand__', '__ior__', '__isub__', '__ixor__'])
+def test_in_place_operators_return_self(operator):
+    items = OrderedSet('abc')
+    assert getattr(items, operator)('bd') is items
+
+
+def test_in_place_results():
+    items = OrderedSet('abc')
+    items &= 'cbx'
+    assert list(items) == ['b', 'c']
+    items -= 'c'
+    items |= 'xy'
+    items ^= 'yz'
+    assert list(items) == ['b', 'x', 'z']
+    assert items.intersection('bz', 'zb') == OrderedSet('bz')
+    assert list(items.union('q', 'r')) == ['b', 'x', 'z', 'q', 'r']
+
+
+def test_cardinal_directions():
+    assert CardinalDirections.get('N') is CardinalDirections.NORTH.value
+    assert CardinalDirections.get('X', CardinalDirections.EAST.value) is CardinalDirections.EAST.value
+    with pytest.raises(KeyError):
+        CardinalDirections.get('X')
+
+
+def test_point_add():
+    assert Point(1, 2) + CardinalDirections.NORTH.value == Point(1, 1)
+    assert Point(1, 2) + (3, 4) == Point(4, 6)
+    assert (3, 4) + Point(1, 2) == Point(4, 6)
+
+
+def test_grid():
+    grid = Grid(10, 5)
+    assert len(grid) == 50
+    assert grid.encode(3, 2) == 23
+    assert grid.decode(23) == Point(3, 2)
+    assert grid.neighbors(23) == tuple(23 + x for x in grid.offsets) == (13, 22, 24, 33)
+    assert [grid.decode(23 + grid.moves[x]) for x in 'NESW'] == [
+        Point(3, 1), Point(4, 2), Point(3, 3), Point(2, 2)
+    ]
+    centered = Grid(100, origin=(50, 50))
+    assert centered.decode(centered.encode(-7, -3)) == Point(-7, -3)
+    assert centered.encode(0, 0) + centered.moves['W'] == centered.encode(-1, 0)
+
+
+ROUTE = 'NEESSWWN' * 500
+
+
+def walk_points(route: str):
+    position = Point(0, 0)
+    path = []
+    for icon in route:
+        position += CardinalDirections.get(icon)
+        path.append(position)
+    return path
+
+
+def walk_grid(route: str):
+    grid = Grid(1 << 16, origin=(1 << 15, 1 << 15))
+    moves = grid.moves
+    position = grid.encode(0, 0)
+    path = []
+    for icon in route:
+        position += moves[icon]
+        path.append(position)
+    return path
+
+
+def bytes_per_step(walk, route: str) -> float:
+    """Memory allocated per step for the positions along a walk."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        path = walk(route)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    assert len(set(path)) == 8
+    return sum(x.size_diff for x in after.compare_to(before, 'filename')) / len(route)
+
+
+def test_allocations():
+    # A Point is a 2-tuple (56 bytes), an encoded position a single int (28-32 bytes)
+    assert bytes_per_step(walk_grid, ROUTE) < bytes_per_step(walk_points, ROUTE) * 0.75
+
+
+def test_benchmark_walk_points(benchmark):
+    assert len(set(benchmark(walk_points, ROUTE))) == 8
+
+
+def test_benchmark_walk_grid(benchmark):
+    assert len(set(benchmark(walk_grid, ROUTE))) == 8
@@ -1,99 +1,166 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 import enum
-from collections import UserList
-from typing import Optional, Iterable, Hashable, NamedTuple, Union, Tuple
+from collections import abc
+from typing import Optional, Iterable, Hashable, NamedTuple, Union, Tuple, Dict, List, Iterator, AbstractSet
 
 
-class OrderedSet(UserList):
+class OrderedSet(abc.MutableSet):
+    """A set that remembers insertion order.
 
-    def __init__(self, initlist: Optional[Iterable[Hashable]] = ...) -> None:
-        super().__init__(initlist)
+    The items are the keys of a dict, so membership, ``add`` and ``discard`` are
+    O(1) and the set algebra is linear. The list-style ``append``/``extend`` and
+    indexing are kept for the callers that grew up with the list-backed version.
+    The binary operators accept any iterable, not only other sets. Indexing
+    goes through a list of the items that is cached until the set changes.
+    """
+
+    def __init__(self, initlist: Optional[Iterable[Hashable]] = None) -> None:
+        self._data: Dict[Hashable, None] = dict.fromkeys(() if initlist is None else initlist)
+        self._items: Optional[List[Hashable]] = None
 
     @property
-    def _set(self):
-        return set(self.data)
+    def data(self) -> List[Hashable]:
+        return list(self._data)
+
+    def _list(self) -> List[Hashable]:
+        if self._items is None:
+            self._items = list(self._data)
+        return self._items
 
     def __contains__(self, item: object) -> bool:
-        return self._set.__contains__(item)
+        return item in self._data
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._data)
+
+    def __reversed__(self) -> Iterator[Hashable]:
+        return reversed(self._list())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return OrderedSet(self._list()[index])
+        return self._list()[index]
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.data!r})'
+
+    def copy(self) -> 'OrderedSet':
+        return OrderedSet(self._data)
 
     def __add__(self, other: Iterable) -> 'OrderedSet':
-        new = self[:]
+        new = self.copy()
         new.extend(other)
         return new
 
-    def __iadd__(self, other: Iterable) -> None:
+    def __iadd__(self, other: Iterable) -> 'OrderedSet':
         self.extend(other)
+        return self
 
     def __and__(self, other: Iterable) -> 'OrderedSet':
-        new = self._set & set(other)
-        return OrderedSet(x for x in self if x in new)
+        other = _as_set(other)
+        return OrderedSet(x for x in self if x in other)
 
-    def __iand__(self, other: Iterable) -> None:
-        diff = self._set - set(other)
-        for x in diff:
-            try:
-                self.remove(x)
-            except ValueError:
-                pass
+    def __iand__(self, other: Iterable) -> 'OrderedSet':
+        other = _as_set(other)
+        self._data = {x: None for x in self._data if x in other}
+        self._items = None
+        return self
 
     def __sub__(self, other: Iterable) -> 'OrderedSet':
-        new = self._set - set(other)
-        return OrderedSet(x for x in self if x in new)
+        other = _as_set(other)
+        return OrderedSet(x for x in self if x not in other)
 
-    def __isub__(self, other: Iterable) -> None:
-        new = self._set - set(other)
-        lyst = self[:]
-        for x in lyst:
-            if x not in new:
-                self.remove(x)
+    def __isub__(self, other: Iterable) -> 'OrderedSet':
+        for x in other:
+            self._data.pop(x, None)
+        self._items = None
+        return self
 
     def __or__(self, other: Iterable) -> 'OrderedSet':
-        return self + OrderedSet(other)
+        return self + other
 
-    def __ior__(self, other: Iterable) -> None:
+    def __ior__(self, other: Iterable) -> 'OrderedSet':
         self.extend(other)
+        return self
 
     def __xor__(self, other: Iterable) -> 'OrderedSet':
-        new = self._set ^ set(other)
-        return OrderedSet(x for x in self if x in new) + OrderedSet(x for x in other if x in new)
+        new = self.copy()
+        new ^= other
+        return new
 
-    def __ixor__(self, other: Iterable) -> None:
-        new = self._set ^ set(other)
-        lyst = self[:]
-        for x in lyst:
-            if x not in new:
-                self.remove(x)
-        self.extend(OrderedSet(x for x in other if x in new))
+    def __ixor__(self, other: Iterable) -> 'OrderedSet':
+        for x in OrderedSet(other):
+            if x in self._data:
+                del self._data[x]
+            else:
+                self._data[x] = None
+        self._items = None
+        return self
 
     def __gt__(self, other: Iterable) -> bool:
-        return self._set > set(other)
+        return self._data.keys() > _as_set(other)
 
     def __ge__(self, other: Iterable) -> bool:
-        return self._set >= set(other)
+        return self._data.keys() >= _as_set(other)
 
     def __lt__(self, other: Iterable) -> bool:
-        return self._set < set(other)
+        return self._data.keys() < _as_set(other)
 
     def __le__(self, other: Iterable) -> bool:
-        return self._set <= set(other)
+        return self._data.keys() <= _as_set(other)
 
     def __eq__(self, other: Iterable) -> bool:
-        return self._set == set(other)
+        if not isinstance(other, abc.Iterable):
+            return NotImplemented
+        return self._data.keys() == _as_set(other)
+
+    __hash__ = None
 
     def extend(self, other: Iterable[Hashable]) -> None:
-        other = [x for x in other if x not in self]
-        super().extend(other)
+        self._data.update(dict.fromkeys(other))
+        self._items = None
 
     def append(self, item: Hashable) -> None:
-        if item not in self:
-            super().append(item)
+        self.add(item)
 
     def add(self, item: Hashable) -> None:
-        self.append(item)
+        self._data[item] = None
+        self._items = None
+
+    def remove(self, item: Hashable) -> None:
+        try:
+            del self._data[item]
+        except KeyError:
+            raise ValueError(f"<{item}> is not in the set.") from None
+        self._items = None
+
+    def discard(self, item: Hashable) -> None:
+        self._data.pop(item, None)
+        self._items = None
+
+    def pop(self, index: int = -1) -> Hashable:
+        """Remove and return the last item, or the one at ``index``."""
+        if index == -1:
+            try:
+                item = self._data.popitem()[0]
+            except KeyError:
+                raise IndexError("pop from an empty OrderedSet") from None
+        else:
+            item = self._list()[index]
+            del self._data[item]
+        self._items = None
+        return item
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._items = None
 
     def difference(self, *others: Iterable) -> 'OrderedSet':
-        new = OrderedSet(self)
+        new = self.copy()
         for other in others:
             new -= other
         return new
@@ -103,10 +170,9 @@ class OrderedSet(UserList):
             self -= other
 
     def intersection(self, *others: Iterable) -> 'OrderedSet':
-        new = OrderedSet(self)
+        new = self.copy()
         for other in others:
             new &= other
-
         return new
 
     def intersection_update(self, *others: Iterable) -> None:
@@ -120,20 +186,23 @@ class OrderedSet(UserList):
         self ^= other
 
     def union(self, *others: Iterable) -> 'OrderedSet':
-        new = OrderedSet(self)
+        new = self.copy()
         for other in others:
-            new | other
+            new |= other
         return new
 
     def update(self, *others: Iterable) -> None:
         for other in others:
             self.extend(other)
 
-    def discard(self, item: Hashable):
-        try:
-            self.remove(item)
-        except ValueError:
-            pass
+
+def _as_set(other: Iterable) -> AbstractSet:
+    """View an iterable as a set without copying it when it already is one."""
+    if isinstance(other, OrderedSet):
+        return other._data.keys()
+    if isinstance(other, abc.Set):
+        return other
+    return set(other)
 
 
 class Direction(NamedTuple):
@@ -150,12 +219,13 @@ class CardinalDirections(enum.Enum):
 
     @classmethod
     def get(cls, icon: str, default: Direction = None):
-        for direction in cls:
-            if direction.value.icon == icon:
-                return direction.value
-        if default:
-            return default
-        raise KeyError(f"<{icon}> is not a valid direction.")
+        direction = ICONS.get(icon, default)
+        if direction is None:
+            raise KeyError(f"<{icon}> is not a valid direction.")
+        return direction
+
+
+ICONS: Dict[str, Direction] = {x.value.icon: x.value for x in CardinalDirections}
 
 
 class Point(NamedTuple):
@@ -163,11 +233,55 @@ class Point(NamedTuple):
     y: int
 
     def __add__(self, other: Union['Point', Direction, Tuple[int, int]]):
-        if len(other) == 2:
-            x, y = other
-        else:
-            x, y = other.x, other.y
+        if type(other) is Direction:
+            return Point(self.x + other.x, self.y + other.y)
+        x, y = other
         return Point(self.x + x, self.y + y)
 
     def __radd__(self, other: Union['Point', Direction]):
         return self.__add__(other)
+
+
+class Grid:
+    """Integer-encoded coordinates, ``(x, y)`` -> ``(y + origin.y) * width + x + origin.x``.
+
+    A step in any direction is a single integer addition with the offsets worked
+    out here, so hot loops can move around without building a Point per step.
+    Give an ``origin`` to encode negative coordinates as well.
+
+    Examples
+    --------
+    >>> grid = Grid(10)
+    >>> grid.encode(3, 2)
+    23
+    >>> grid.decode(23 + grid.moves['N'])
+    Point(x=3, y=1)
+    """
+    __slots__ = ('width', 'height', 'origin', 'offsets', 'moves')
+
+    def __init__(self, width: int, height: int = None, origin: Tuple[int, int] = (0, 0)):
+        self.width = width
+        self.height = height
+        self.origin = Point(*origin)
+        # Reading order: up, left, right, down
+        self.offsets = (-width, -1, 1, width)
+        self.moves: Dict[str, int] = {icon: self.offset(x) for icon, x in ICONS.items()}
+
+    def offset(self, direction: Union[Direction, Tuple[int, int]]) -> int:
+        """The change in index for one step in ``direction``."""
+        x, y = (direction.x, direction.y) if type(direction) is Direction else direction
+        return y * self.width + x
+
+    def encode(self, x: int, y: int) -> int:
+        return (y + self.origin.y) * self.width + x + self.origin.x
+
+    def decode(self, index: int) -> Point:
+        y, x = divmod(index, self.width)
+        return Point(x - self.origin.x, y - self.origin.y)
+
+    def neighbors(self, index: int) -> Tuple[int, int, int, int]:
+        """The four neighbors of a cell, in reading order."""
+        return index - self.width, index - 1, index + 1, index + self.width
+
+    def __len__(self) -> int:
+        return self.width * (self.height or 0)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+import importlib
+import pathlib
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Union
+
+from util import BASEDIR
+
+ROOTDIR = BASEDIR.parent
+
+
+class InputRegistry(Mapping):
+    """Lazily read and cache the puzzle inputs of every day package.
+
+    Each ``decN`` package only declares path constants (``INPUT``, ``EXAMPLE``, ...),
+    so importing it is free. A file is read the first time it's asked for and
+    served from memory afterwards. The list of days is found once, and checking
+    whether a day exists never reads its input.
+
+    Examples
+    --------
+    >>> INPUTS['dec14'] == INPUTS.read('dec14', 'INPUT')
+    True
+    >>> 'dec14' in INPUTS
+    True
+    """
+
+    def __init__(self, root: pathlib.Path = ROOTDIR):
+        self.root = root
+        self._cache: Dict[pathlib.Path, str] = {}
+        self._days: Optional[List[str]] = None
+
+    @property
+    def days(self) -> List[str]:
+        if self._days is None:
+            self._days = sorted(
+                (x.parent.name for x in self.root.glob('dec*/__init__.py')),
+                key=lambda x: int(x[3:])
+            )
+        return self._days
+
+    def path(self, day: str, name: str = 'INPUT') -> pathlib.Path:
+        """Look up a path constant from a day package without reading it."""
+        return getattr(importlib.import_module(day), name)
+
+    def _resolve(self, day: Union[str, pathlib.Path], name: str) -> pathlib.Path:
+        path = day if isinstance(day, pathlib.Path) else self.path(day, name)
+        return path.resolve()
+
+    def read(self, day: Union[str, pathlib.Path], name: str = 'INPUT') -> str:
+        """Read a day's input (or any path), caching it after the first read."""
+        path = self._resolve(day, name)
+        text = self._cache.get(path)
+        if text is None:
+            text = self._cache[path] = path.read_text()
+        return text
+
+    def is_cached(self, day: Union[str, pathlib.Path], name: str = 'INPUT') -> bool:
+        """Whether a day's input (or any path) has been read already."""
+        return self._resolve(day, name) in self._cache
+
+    def clear(self):
+        """Forget every file read so far, and look for the days again next time."""
+        self._cache.clear()
+        self._days = None
+
+    def __contains__(self, day: object) -> bool:
+        return day in self.days
+
+    def __getitem__(self, day: str) -> str:
+        if day not in self.days:
+            raise KeyError(day)
+        return self.read(day)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.days)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+
+INPUTS = InputRegistry()